@@ -31,11 +31,11 @@ class SwarmVisualizer(object):
         self._canvas.update()
         vispy.app.process_events()
 
-    def set_markers(self, position):
+    def set_markers(self, position, face_color=(1,0,0), size=20):
         assert position.ndim is 2 and position.shape[-1] in (2,3)
         if self._markers is None:
             self._markers = visuals.Markers(parent=self._view.scene)
-        self._markers.set_data(position, face_color=(1,0,0), size=20)
+        self._markers.set_data(position, face_color=face_color, size=size)
         self._canvas.update()
         vispy.app.process_events()
 
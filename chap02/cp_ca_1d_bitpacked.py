@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ビットパックした1次元セルオートマトン(CA)
+
+np.int8 の状態では1セルに8ビット使ってしまうので、ここでは64セルを1つの
+np.uint64 のワードに詰めて保持する (セル i はワード i//64 の下から i%64 ビット目)。
+左右のセルはワード列全体を1ビットずらした配列として作り、
+Wolfram code の RULE はそれらの論理演算 (AND/OR/NOT) の式として評価する。
+SPACE_SIZE が64の倍数でない場合も、ワードの境界をまたいで周期境界条件を正しく扱う。
+最後の軸を空間とみなし、それより前の軸はバッチとして扱う。
+"""
+
+import time
+import numpy as np
+
+WORD_BITS = 64
+ONE = np.uint64(1)
+TOP_BIT = np.uint64(WORD_BITS - 1)
+
+
+def n_words(space_size):
+    """space_size 個のセルを詰めるのに必要なワード数"""
+    return -(-space_size // WORD_BITS)
+
+
+def pack(state):
+    """
+    0/1 の状態 (..., SPACE_SIZE) を np.uint64 のワード列 (..., n_words) に詰める関数。
+    余ったビット (パディング) は0にする。
+    """
+    space_size = state.shape[-1]
+    packed_bytes = np.packbits(state.astype(bool), axis=-1, bitorder='little')
+    buf = np.zeros(state.shape[:-1] + (n_words(space_size) * 8,), dtype=np.uint8)
+    buf[..., :packed_bytes.shape[-1]] = packed_bytes
+    return buf.view('<u8').astype(np.uint64, copy=False)
+
+
+def unpack(words, space_size, out=None):
+    """
+    pack の逆。ワード列から np.int8 の状態 (..., space_size) を作る関数。
+    """
+    packed_bytes = np.ascontiguousarray(words).astype('<u8', copy=False).view(np.uint8)
+    bits = np.unpackbits(packed_bytes, axis=-1, count=space_size, bitorder='little')
+    if out is None:
+        return bits.astype(np.int8)
+    out[...] = bits
+    return out
+
+
+def mask_padding(words, space_size):
+    """最後のワードの、space_size を超える部分のビットを0にする関数"""
+    rest = space_size % WORD_BITS
+    if rest:
+        words[..., -1] &= (ONE << np.uint64(rest)) - ONE
+    return words
+
+
+def shift_from_left(words, space_size, out):
+    """
+    out のセル i に、words のセル i-1 (左のセル) を入れる関数。
+    セル0には周期境界条件でセル space_size-1 が入る。
+    """
+    np.left_shift(words, ONE, out=out)
+    out[..., 1:] |= words[..., :-1] >> TOP_BIT
+    last, bit = divmod(space_size - 1, WORD_BITS)
+    out[..., 0] |= (words[..., last] >> np.uint64(bit)) & ONE
+    return mask_padding(out, space_size)
+
+
+def shift_from_right(words, space_size, out):
+    """
+    out のセル i に、words のセル i+1 (右のセル) を入れる関数。
+    セル space_size-1 には周期境界条件でセル0が入る。
+    words のパディングは0である必要がある。
+    """
+    np.right_shift(words, ONE, out=out)
+    out[..., :-1] |= words[..., 1:] << TOP_BIT
+    last, bit = divmod(space_size - 1, WORD_BITS)
+    out[..., last] |= (words[..., 0] & ONE) << np.uint64(bit)
+    return out
+
+
+def rule_minterms(rule):
+    """
+    RULE を論理式 (積和形) で表すための項を返す関数。
+    1になる近傍コードが5つ以上ある場合は、0になるコードの積和を作って最後に反転する方が
+    演算が少ないので、(反転するかどうか, 近傍コードのリスト) を返す。
+    """
+    codes = [code for code in range(8) if (rule >> code) & 1]
+    if len(codes) > 4:
+        return True, [code for code in range(8) if not (rule >> code) & 1]
+    return False, codes
+
+
+def step_packed(words, next_words, space_size, rule, work=None):
+    """
+    ビットパックした状態を1ステップ更新し、結果を next_words に書き込む関数。
+
+    引数:
+    words (np.ndarray): pack で作った現在の状態。
+    next_words (np.ndarray): 次の状態を書き込む配列 (words と同じ形)。
+    space_size (int): セルの数 (SPACE_SIZE)。
+    rule (int): Wolfram code。
+    work (tuple): allocate_work で確保した作業配列。ループ内で使い回すと確保が不要になる。
+    """
+    if work is None:
+        work = allocate_work(words.shape)
+    l, r, not_l, not_c, not_r, term = work
+    shift_from_left(words, space_size, l)
+    shift_from_right(words, space_size, r)
+    np.invert(l, out=not_l)
+    np.invert(words, out=not_c)
+    np.invert(r, out=not_r)
+    invert, codes = rule_minterms(rule)
+    next_words[...] = 0
+    for code in codes:
+        # 近傍コード code = 2^2*l + 2^1*c + 2^0*r に一致するセルだけ1になる項
+        np.bitwise_and(l if code & 4 else not_l, words if code & 2 else not_c, out=term)
+        term &= r if code & 1 else not_r
+        next_words |= term
+    if invert:
+        np.invert(next_words, out=next_words)
+    return mask_padding(next_words, space_size)
+
+
+def allocate_work(shape):
+    """step_packed 用の作業配列を確保する関数"""
+    return tuple(np.empty(shape, dtype=np.uint64) for _ in range(6))
+
+
+if __name__ == '__main__':
+    from cp_ca_1d_engine import make_rule_table, step
+
+    SPACE_SIZE = 1000003  # 64の倍数でない場合も周期境界条件が正しいことを確認する
+    RULE = 110
+    STEPS = 100
+
+    state = np.random.randint(2, size=SPACE_SIZE).astype(np.int8)
+    next_state = np.empty_like(state)
+    words = pack(state)
+    next_words = np.empty_like(words)
+    work = allocate_work(words.shape)
+
+    table = make_rule_table(RULE)
+    code = np.empty(SPACE_SIZE, dtype=np.intp)
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        step(state, next_state, table, code)
+        state, next_state = next_state, state
+    time_int8 = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        step_packed(words, next_words, SPACE_SIZE, RULE, work)
+        words, next_words = next_words, words
+    time_packed = time.perf_counter() - start
+
+    assert np.array_equal(unpack(words, SPACE_SIZE), state)
+    print("np.int8  : {:10d} bytes, {:.3f} s".format(state.nbytes, time_int8))
+    print("np.uint64: {:10d} bytes, {:.3f} s".format(words.nbytes, time_packed))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+1次元セルオートマトン(CA)の計算エンジン
+
+cp_celllar_automata_1d.py ではセルごとに Python の for ループで
+neighbor_cell_code を計算していたが、ここでは配列のシフトで格子全体の
+3ビット近傍コードを一度に計算し、ルールのルックアップテーブルを引く。
+状態は (SPACE_SIZE,) だけでなく (n_rules, SPACE_SIZE) のように
+先頭にバッチ軸を持つ配列も扱えるので、256個のルールをまとめて計算できる。
+半径 r、k 状態のルールや総和型 (totalistic, outer totalistic) のルールは
+step_general で計算する。
+"""
+
+import time
+import numpy as np
+
+ALL_RULES = np.arange(256)
+
+
+def make_rule_table(rule):
+    """
+    Wolfram code からルールテーブルを作る関数。
+
+    引数:
+    rule (int または intの配列): Wolfram code。配列を与えた場合はルールごとのテーブルを返す。
+
+    戻り値:
+    np.int8 の配列。形は (8,) または (len(rule), 8)。
+    table[n] が近傍コード n に対する次の状態。
+    """
+    rule = np.asarray(rule)
+    return ((rule[..., np.newaxis] >> np.arange(8)) & 1).astype(np.int8)
+
+
+def neighbor_code(state, out=None):
+    """
+    周期境界条件で、格子全体の近傍コード 2^2*l + 2^1*c + 2^0*r を計算する関数。
+    最後の軸を空間とみなし、それより前の軸はバッチとして扱う。
+
+    引数:
+    state (np.ndarray): 0/1 の状態。
+    out (np.ndarray): 結果を書き込む配列 (省略時は新しく確保する)。
+    """
+    if out is None:
+        out = np.empty(state.shape, dtype=np.intp)
+    # 左のセル (2^2の桁)
+    out[..., 1:] = state[..., :-1]
+    out[..., 0] = state[..., -1]
+    out <<= 1
+    # 中央のセル (2^1の桁)
+    out += state
+    out <<= 1
+    # 右のセル (2^0の桁)
+    out[..., :-1] += state[..., 1:]
+    out[..., -1] += state[..., 0]
+    return out
+
+
+def step(state, next_state, table, code=None):
+    """
+    1ステップ分の更新を行い、結果を next_state に書き込む関数。
+
+    引数:
+    state (np.ndarray): 現在の状態。形は (SPACE_SIZE,) または (バッチ, SPACE_SIZE)。
+    next_state (np.ndarray): 次の状態を書き込む配列 (state と同じ形、同じ dtype)。
+    table (np.ndarray): make_rule_table で作ったテーブル。
+                        (8,) なら全てのバッチに同じルールを、
+                        (バッチ, 8) なら行ごとに別のルールを適用する。
+    code (np.ndarray): 近傍コード用の作業配列 (np.intp)。ループ内で使い回すと確保が不要になる。
+    """
+    code = neighbor_code(state, code)
+    if table.ndim == 2:
+        # 行ごとに別のテーブルを引くため、平坦化したテーブル上の位置にずらす
+        code += 8 * np.arange(len(table)).reshape((-1,) + (1,) * (state.ndim - 1))
+    np.take(table.astype(next_state.dtype, copy=False), code, out=next_state, mode='clip')
+    return next_state
+
+
+def neighbor_weights(k=2, r=1, kind="general"):
+    """
+    半径 r、k 状態の近傍コードを作るための重みを返す関数。
+    近傍コードは、位置 i-r ... i+r のセルの状態と重みの積和 (重み付き畳み込み) になる。
+
+    引数:
+    k (int): セルの状態の数。
+    r (int): 近傍の半径。
+    kind (str): "general" ならセルの並びを k 進数とみなしたコード (k=2, r=1 で 2^2*l + 2^1*c + 2^0*r)、
+                "totalistic" なら近傍の状態の和、
+                "outer_totalistic" なら 中央以外の和 * k + 中央の状態。
+    """
+    width = 2 * r + 1
+    if kind == "general":
+        return k ** np.arange(width - 1, -1, -1, dtype=np.intp)
+    elif kind == "totalistic":
+        return np.ones(width, dtype=np.intp)
+    elif kind == "outer_totalistic":
+        weights = np.full(width, k, dtype=np.intp)
+        weights[r] = 1
+        return weights
+    raise ValueError("Invalid kind: {}".format(kind))
+
+
+def table_size(k=2, r=1, kind="general"):
+    """ルールテーブルの長さ (近傍コードの取りうる値の数)"""
+    width = 2 * r + 1
+    if kind == "general":
+        return k ** width
+    elif kind == "totalistic":
+        return width * (k - 1) + 1
+    elif kind == "outer_totalistic":
+        return k * (2 * r * (k - 1) + 1)
+    raise ValueError("Invalid kind: {}".format(kind))
+
+
+def make_general_rule_table(rule, k=2, r=1, kind="general"):
+    """
+    ルール番号を k 進数で展開してルールテーブルを作る関数。
+    table[n] (ルール番号の k 進数の下から n 桁目) が近傍コード n に対する次の状態。
+    k=2, r=1, kind="general" では make_rule_table と同じ Wolfram code になる。
+    ルール番号は非常に大きくなりうるので Python の int のまま計算する。
+    """
+    size = table_size(k, r, kind)
+    rule = int(rule)
+    table = np.empty(size, dtype=np.int8)
+    for n in range(size):
+        rule, table[n] = divmod(rule, k)
+    return table
+
+
+def general_neighbor_code(state, weights, out=None):
+    """
+    周期境界条件で、格子全体の近傍コードを1回の重み付き畳み込みで計算する関数。
+    最後の軸を空間とみなし、それより前の軸はバッチとして扱う。
+    近傍を広げても Python のループは増えない。
+
+    引数:
+    state (np.ndarray): 0 ... k-1 の状態。
+    weights (np.ndarray): neighbor_weights で作った長さ 2r+1 の重み。
+    out (np.ndarray): 結果を書き込む配列 (np.intp、省略時は新しく確保する)。
+    """
+    r = len(weights) // 2
+    n = state.shape[-1]
+    padded = np.concatenate((state[..., n - r:], state, state[..., :r]), axis=-1)
+    windows = np.lib.stride_tricks.sliding_window_view(padded, len(weights), axis=-1)
+    return np.matmul(windows, weights.astype(np.intp), out=out)
+
+
+def step_general(state, next_state, table, weights, code=None):
+    """
+    半径 r、k 状態の (総和型も含む) ルールで1ステップ更新する関数。
+    table はルール表 (make_general_rule_table)、weights は neighbor_weights で作ったもの。
+    table が (バッチ, テーブル長) の場合は行ごとに別のルールを適用する。
+    """
+    code = general_neighbor_code(state, weights, code)
+    if table.ndim == 2:
+        code += table.shape[1] * np.arange(len(table)).reshape((-1,) + (1,) * (state.ndim - 1))
+    np.take(table.astype(next_state.dtype, copy=False), code, out=next_state, mode='clip')
+    return next_state
+
+
+def step_loop(state, next_state, rule):
+    """
+    cp_celllar_automata_1d.py の元の実装 (セルごとの for ループ)。
+    ベンチマークと結果の確認用。
+    (np.int8 のまま RULE をシフトすると 128 以上のルールで溢れるので int に直している)
+    """
+    SPACE_SIZE = len(state)
+    for i in range(SPACE_SIZE):
+        l = int(state[i-1])
+        c = int(state[i])
+        r = int(state[(i+1)%SPACE_SIZE])
+        neighbor_cell_code = 2**2 * l + 2**1 * c + 2**0 * r
+        if (rule >> neighbor_cell_code) & 1:
+            next_state[i] = 1
+        else:
+            next_state[i] = 0
+    return next_state
+
+
+def measure_throughput(space_size=600, steps=100, rules=ALL_RULES, loop_steps=5):
+    """
+    1秒あたりのセル更新数 (cell-updates/s) を測定する関数。
+
+    戻り値:
+    dict。"loop" は元の for ループ、"vectorized" は1ルールずつのベクトル化、
+    "batched" は rules 全てを (len(rules), space_size) の配列でまとめて計算した場合。
+    """
+    rules = np.asarray(rules)
+    result = {}
+
+    state = np.random.randint(2, size=space_size).astype(np.int8)
+    next_state = np.empty_like(state)
+    start = time.perf_counter()
+    for _ in range(loop_steps):
+        step_loop(state, next_state, int(rules[0]))
+        state, next_state = next_state, state
+    result["loop"] = space_size * loop_steps / (time.perf_counter() - start)
+
+    table = make_rule_table(rules[0])
+    code = np.empty(space_size, dtype=np.intp)
+    start = time.perf_counter()
+    for _ in range(steps):
+        step(state, next_state, table, code)
+        state, next_state = next_state, state
+    result["vectorized"] = space_size * steps / (time.perf_counter() - start)
+
+    tables = make_rule_table(rules)
+    states = np.random.randint(2, size=(len(rules), space_size)).astype(np.int8)
+    next_states = np.empty_like(states)
+    code = np.empty(states.shape, dtype=np.intp)
+    start = time.perf_counter()
+    for _ in range(steps):
+        step(states, next_states, tables, code)
+        states, next_states = next_states, states
+    result["batched"] = states.size * steps / (time.perf_counter() - start)
+    return result
+
+
+if __name__ == '__main__':
+    for name, value in measure_throughput().items():
+        print("{:>10s}: {:.3e} cell-updates/s".format(name, value))
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+1次元セルオートマトン(CA)の時空図をウィンドウを開かずに作るスクリプト
+
+T 世代分の状態を1行ずつメモリマップした (T, SPACE_SIZE) の .npy ファイルに書き込み、
+その後、時空図をタイルに分けて PNG に書き出す。
+どちらの段階でも時空図全体をメモリに載せないので、100k x 100k のような大きな図も作れる。
+packed=True の場合は np.packbits で8セルを1バイトに詰めて保存する。
+"""
+
+import os
+import json
+import numpy as np
+from cp_ca_1d_engine import make_rule_table, step
+
+# シミュレーションの各パラメタ
+SPACE_SIZE = 10000
+STEPS = 10000
+RULE = 110
+TILE_SIZE = 4096  # PNGのタイルの一辺 (packed の場合は8の倍数)
+FLUSH_INTERVAL = 1024  # 何行ごとにファイルへ書き出すか
+
+
+def _meta_path(path):
+    return path + ".json"
+
+
+def run_to_memmap(path, rule, state, steps, packed=False):
+    """
+    初期状態 state から steps 世代分を計算し、時空図を path (.npy) に書き込む関数。
+    1行目が初期状態。時空図の大きさなどは path + ".json" に保存する。
+
+    引数:
+    path (str): 書き込む .npy ファイルのパス。
+    rule (int): Wolfram code。
+    state (np.ndarray): 初期状態 (SPACE_SIZE,)。
+    steps (int): 時空図の行数 T。
+    packed (bool): True なら1行を np.packbits で詰めて保存する。
+
+    戻り値:
+    読み込み専用でメモリマップした時空図。
+    """
+    space_size = len(state)
+    row_size = -(-space_size // 8) if packed else space_size
+    dtype = np.uint8 if packed else np.int8
+    diagram = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(steps, row_size))
+    with open(_meta_path(path), 'w') as fp:
+        json.dump({"rule": int(rule), "space_size": space_size, "steps": steps, "packed": packed}, fp)
+
+    state = state.astype(np.int8)
+    next_state = np.empty_like(state)
+    table = make_rule_table(rule)
+    code = np.empty(space_size, dtype=np.intp)
+    for t in range(steps):
+        if packed:
+            diagram[t] = np.packbits(state)
+        else:
+            diagram[t] = state
+        step(state, next_state, table, code)
+        state, next_state = next_state, state
+        if (t + 1) % FLUSH_INTERVAL == 0:
+            diagram.flush()
+    diagram.flush()
+    del diagram
+    return load(path)[0]
+
+
+def load(path):
+    """
+    run_to_memmap で書き込んだ時空図を読み込み専用でメモリマップする関数。
+
+    戻り値:
+    (時空図, メタデータのdict)
+    """
+    with open(_meta_path(path)) as fp:
+        meta = json.load(fp)
+    return np.load(path, mmap_mode='r'), meta
+
+
+def read_rows(diagram, meta, row_start, row_end, col_start=0, col_end=None):
+    """
+    時空図の一部分を 0/1 の np.uint8 の配列として読み出す関数。
+    packed の場合も、読み出す範囲の分だけを展開する。
+    """
+    space_size = meta["space_size"]
+    if col_end is None:
+        col_end = space_size
+    if not meta["packed"]:
+        return np.asarray(diagram[row_start:row_end, col_start:col_end], dtype=np.uint8)
+    byte_start = col_start // 8
+    byte_end = -(-col_end // 8)
+    bits = np.unpackbits(diagram[row_start:row_end, byte_start:byte_end], axis=1)
+    offset = col_start - byte_start * 8
+    return bits[:, offset:offset + col_end - col_start]
+
+
+def export_png_tiles(path, out_dir, tile_size=TILE_SIZE):
+    """
+    時空図を tile_size x tile_size のタイルに分けて PNG に書き出す関数。
+    一度に読み込むのは1タイル分だけ。ファイル名は tile_{行}_{列}.png。
+    色は cp_celllar_automata_1d.py の imshow (cmap='gray') と同じく、1が白、0が黒。
+
+    戻り値:
+    書き出したファイルのパスのリスト。
+    """
+    from PIL import Image
+    diagram, meta = load(path)
+    steps, space_size = meta["steps"], meta["space_size"]
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for ti, row_start in enumerate(range(0, steps, tile_size)):
+        row_end = min(row_start + tile_size, steps)
+        for tj, col_start in enumerate(range(0, space_size, tile_size)):
+            col_end = min(col_start + tile_size, space_size)
+            tile = read_rows(diagram, meta, row_start, row_end, col_start, col_end)
+            tile_path = os.path.join(out_dir, "tile_{:04d}_{:04d}.png".format(ti, tj))
+            Image.fromarray(tile.astype(bool)).save(tile_path)
+            paths.append(tile_path)
+    return paths
+
+
+if __name__ == '__main__':
+    # 最初の状態を初期化
+    state = np.zeros(SPACE_SIZE, dtype=np.int8)
+    ### ランダム ###
+    # state[:] = np.random.randint(2, size=len(state))
+    ### 中央の１ピクセルのみ１、後は０ ###
+    state[len(state)//2] = 1
+
+    path = "rule{}_{}x{}.npy".format(RULE, STEPS, SPACE_SIZE)
+    run_to_memmap(path, RULE, state, STEPS, packed=True)
+    tiles = export_png_tiles(path, "rule{}_tiles".format(RULE))
+    print("{} tiles written.".format(len(tiles)))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+1次元セルオートマトン(CA)のルール空間の調査
+
+cp_celllar_automata_1d.py のように RULE を手で書き換えてウィンドウを眺める代わりに、
+全てのルール (または指定したルール) を複数のランダムな初期状態から並列に計算し、
+ルールごとに以下の指標を求めて CSV に書き出す。
+  - density: 後半の世代でのセルの密度 (1の割合)
+  - block_entropy: 長さ BLOCK_SIZE のブロックの出現頻度のエントロピー (1セルあたりのビット数)
+  - compression_ratio: 時空図を zlib で圧縮したときの圧縮率 (小さいほど規則的)
+  - transient_length: 同じ状態が再び現れるまでの過渡期の長さ (見つからなければ -1)
+結果は (rule, size, steps, seed) ごとにディスクにキャッシュするので、
+再実行したときは足りない分だけを計算する。
+"""
+
+import csv
+import zlib
+import numpy as np
+from multiprocessing import Pool
+from cp_ca_1d_engine import ALL_RULES, make_rule_table, step
+from cp_result_cache import ResultCache
+
+# 調査の各パラメタ
+SPACE_SIZE = 256
+STEPS = 512
+SEEDS = range(8)  # 初期状態の乱数のシード
+BLOCK_SIZE = 4
+CACHE_DIR = "ca_1d_survey_cache"
+
+
+def initial_state(space_size, seed):
+    """シードから決まるランダムな初期状態"""
+    return np.random.RandomState(seed).randint(2, size=space_size).astype(np.int8)
+
+
+def run_batch(rule, space_size, steps, seeds):
+    """
+    seeds ごとの初期状態を (len(seeds), space_size) にまとめて steps 世代計算する関数。
+
+    戻り値:
+    時空図 (steps, len(seeds), space_size)。1行目が初期状態。
+    """
+    state = np.array([initial_state(space_size, seed) for seed in seeds])
+    next_state = np.empty_like(state)
+    table = make_rule_table(rule)
+    code = np.empty(state.shape, dtype=np.intp)
+    diagram = np.empty((steps,) + state.shape, dtype=np.int8)
+    for t in range(steps):
+        diagram[t] = state
+        step(state, next_state, table, code)
+        state, next_state = next_state, state
+    return diagram
+
+
+def block_entropy(diagram, block_size=BLOCK_SIZE):
+    """
+    時空図 (T, SPACE_SIZE) の各行から長さ block_size のブロックを (周期境界条件で) 切り出し、
+    その出現頻度のシャノンエントロピーを block_size で割った値を返す関数。
+    """
+    codes = np.zeros(diagram.shape, dtype=np.intp)
+    for j in range(block_size):
+        codes <<= 1
+        codes += np.roll(diagram, -j, axis=-1)
+    counts = np.bincount(codes.ravel(), minlength=2**block_size)
+    p = counts[counts > 0] / codes.size
+    return float(-(p * np.log2(p)).sum() / block_size)
+
+
+def compression_ratio(diagram):
+    """ビットパックした時空図を zlib で圧縮したときの (圧縮後のサイズ / 圧縮前のサイズ)"""
+    raw = np.packbits(diagram).tobytes()
+    return len(zlib.compress(raw, 6)) / len(raw)
+
+
+def transient_length(diagram):
+    """
+    時空図の中で初めて同じ状態が2回現れたとき、最初に現れた世代 (過渡期の長さ) と周期を返す関数。
+    見つからなければ (-1, -1)。
+    """
+    seen = {}
+    for t, row in enumerate(diagram):
+        key = row.tobytes()
+        if key in seen:
+            return seen[key], t - seen[key]
+        seen[key] = t
+    return -1, -1
+
+
+def compute_metrics(args):
+    """
+    1つのルールについて、seeds ごとの指標を計算する関数 (プロセスプールから呼ばれる)。
+
+    戻り値:
+    (rule, {seed: 指標のdict})
+    """
+    rule, space_size, steps, seeds = args
+    diagram = run_batch(rule, space_size, steps, seeds)
+    results = {}
+    for i, seed in enumerate(seeds):
+        d = diagram[:, i]
+        transient, period = transient_length(d)
+        results[seed] = {
+            "density": float(d[steps//2:].mean()),
+            "block_entropy": block_entropy(d[steps//2:]),
+            "compression_ratio": compression_ratio(d),
+            "transient_length": transient,
+            "period": period,
+        }
+    return rule, results
+
+
+def survey(rules=ALL_RULES, space_size=SPACE_SIZE, steps=STEPS, seeds=SEEDS,
+           cache_dir=CACHE_DIR, processes=None):
+    """
+    rules の各ルールを seeds の初期状態から計算し、指標を返す関数。
+    キャッシュに無い (rule, seed) の組だけを、ルールごとにプロセスプールで計算する。
+
+    戻り値:
+    {rule: {seed: 指標のdict}}
+    """
+    cache = ResultCache(cache_dir)
+    results = {}
+    tasks = []
+    for rule in rules:
+        rule = int(rule)
+        results[rule] = {}
+        missing = []
+        for seed in seeds:
+            value = cache.get((rule, space_size, steps, seed))
+            if value is None:
+                missing.append(seed)
+            else:
+                results[rule][seed] = value
+        if missing:
+            tasks.append((rule, space_size, steps, missing))
+
+    if tasks:
+        with Pool(processes) as pool:
+            for rule, computed in pool.imap_unordered(compute_metrics, tasks):
+                for seed, value in computed.items():
+                    cache.put((rule, space_size, steps, seed), value)
+                    results[rule][seed] = value
+    return results
+
+
+def summarize(results):
+    """
+    ルールごとに、seeds について平均した指標のリストを返す関数。
+    transient_length と period は周期が見つかった初期状態だけで平均し (無ければ -1)、
+    周期が見つかった割合を cycle_fraction とする。
+    """
+    rows = []
+    for rule in sorted(results):
+        values = list(results[rule].values())
+        row = {"rule": rule}
+        for name in ("density", "block_entropy", "compression_ratio"):
+            row[name] = float(np.mean([value[name] for value in values]))
+        cycles = [value for value in values if value["period"] > 0]
+        for name in ("transient_length", "period"):
+            row[name] = float(np.mean([value[name] for value in cycles])) if cycles else -1
+        row["cycle_fraction"] = len(cycles) / len(values)
+        rows.append(row)
+    return rows
+
+
+if __name__ == '__main__':  # プロセスプールを使うので、直接実行した場合のみ計算する
+    rows = summarize(survey())
+    output_filename = "ca_1d_survey.csv"
+    with open(output_filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"--- Survey of {len(rows)} rules saved to '{output_filename}' ---")
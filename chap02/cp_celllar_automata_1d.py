@@ -6,6 +6,7 @@ sys.path.append(os.pardir)  # 親ディレクトリのファイルをインポ
 import numpy as np
 from alifebook_lib.visualizers import ArrayVisualizer
 import matplotlib.pyplot as plt
+from cp_ca_1d_engine import make_rule_table, step
 
 # visualizerの初期化 (Appendix参照)
 visualizer = ArrayVisualizer()
@@ -18,6 +19,9 @@ RULE = 30
 # CAの状態空間
 state = np.zeros(SPACE_SIZE, dtype=np.int8)
 next_state = np.empty(SPACE_SIZE, dtype=np.int8)
+# ルールテーブルと近傍コードの作業配列 (ループ内で使い回す)
+rule_table = make_rule_table(RULE)
+neighbor_cell_code = np.empty(SPACE_SIZE, dtype=np.intp)
 
 # 最初の状態を初期化
 ### ランダム ###
@@ -34,21 +38,12 @@ plt.show()
 
 while plt.fignum_exists(fig.number):  # pltはウィンドウが閉じられるとFalseを返す
     # stateから計算した次の結果をnext_stateに保存
-    for i in range(SPACE_SIZE):
-        # left, center, right cellの状態を取得
-        l = state[i-1]
-        c = state[i]
-        r = state[(i+1)%SPACE_SIZE]
-        # neighbor_cell_codeは現在の状態のバイナリコーディング
-        # ex) 現在が[1 1 0]の場合
-        #     neighbor_cell_codeは 1*2^2 + 1*2^1 + 0*2^0 = 6となるので、
-        #     RULEの６番目のビットが１ならば、次の状態は１となるので、
-        #     RULEをneighbor_cell_code分だけビットシフトして１と論理積をとる。
-        neighbor_cell_code = 2**2 * l + 2**1 * c + 2**0 * r
-        if (RULE >> neighbor_cell_code) & 1:
-            next_state[i] = 1
-        else:
-            next_state[i] = 0
+    # 各セルの neighbor_cell_code は現在の状態のバイナリコーディング
+    # ex) 現在が[1 1 0]の場合
+    #     neighbor_cell_codeは 1*2^2 + 1*2^1 + 0*2^0 = 6となるので、
+    #     RULEの６番目のビットが１ならば、次の状態は１となる。
+    # 格子全体の近傍コードを配列のシフトでまとめて計算し、ルールテーブルを引く (cp_ca_1d_engine.py参照)
+    step(state, next_state, rule_table, neighbor_cell_code)
     # 最後に入れ替え
     state, next_state = next_state, state
     # 表示をアップデート
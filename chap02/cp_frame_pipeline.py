@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+計算と描画を切り離すためのフレームの受け渡し
+
+計算する側 (producer) は publish でフレームを渡し、描画・記録する側 (consumer) は latest で最新のフレームを受け取る。
+フレームは最初に確保した n_buffers 個の配列を使い回すので、受け渡しのたびに配列を確保することはない。
+空いている配列が無いとき (描画が追いつかないとき) は、計算する側は待たずにそのフレームを捨てる。
+描画する側も、たまっているフレームのうち最新のもの以外は捨てる。
+そのため計算は描画の速さによらず全速で進み、描画は間に合う分だけ行われる。
+
+GUI (vispy, matplotlib) はメインスレッドで動かす必要があるので、
+計算を別のスレッドで行い、メインスレッドで latest と描画を繰り返す。
+"""
+
+import queue
+import threading
+import numpy as np
+
+
+class FramePipeline(object):
+    """再利用する配列の数が決まった、フレームを捨てることのあるフレームの受け渡し"""
+    def __init__(self, shape, dtype=np.float64, n_buffers=3):
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        for _ in range(n_buffers):
+            self._free.put(np.empty(shape, dtype=dtype))
+        self.published = 0  # publish で渡されたフレームの数
+        self.delivered = 0  # latest で描画する側に渡したフレームの数
+        self.dropped = 0    # 描画が追いつかずに捨てたフレームの数
+        self._closed = threading.Event()
+
+    def publish(self, frame, info=None):
+        """
+        frame をコピーして渡す (計算する側が呼ぶ)。空いている配列が無ければ、待たずに捨てる。
+        info にはフレームの時刻など、一緒に渡したい値を与える。
+
+        戻り値:
+        渡せたら True、捨てたら False。
+        """
+        self.published += 1
+        try:
+            buffer = self._free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        np.copyto(buffer, frame)
+        self._ready.put((buffer, info))
+        return True
+
+    def latest(self, timeout=None):
+        """
+        たまっているフレームのうち最新のものを返す (描画する側が呼ぶ)。古いフレームは捨てる。
+        使い終わったら release で配列を返すこと。
+
+        戻り値:
+        (フレームの配列, info)。timeout 秒待ってもフレームが来なければ None。
+        """
+        try:
+            item = self._ready.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                newer = self._ready.get_nowait()
+            except queue.Empty:
+                self.delivered += 1
+                return item
+            self.release(item[0])
+            self.dropped += 1
+            item = newer
+
+    def release(self, buffer):
+        """latest で受け取った配列を返す"""
+        self._free.put(buffer)
+
+    def close(self):
+        """計算が終わったことを知らせる"""
+        self._closed.set()
+
+    @property
+    def closed(self):
+        return self._closed.is_set()
+
+
+def run_pipeline(produce, pipeline, consume, alive=lambda: True, poll=0.05):
+    """
+    produce(pipeline, stop) を別のスレッドで動かし、メインスレッドでフレームを consume(frame, info) に渡す関数。
+    produce は stop (threading.Event) がセットされたら終わる。
+    alive() が False を返したら (ウィンドウが閉じられたら) stop をセットして計算を止める。
+    produce が例外を送出した場合も pipeline を閉じてループを抜け、その例外を呼び出し側のスレッドで送出し直す。
+
+    戻り値:
+    produce の戻り値。
+    """
+    stop = threading.Event()
+    result = []
+    error = []
+
+    def target():
+        try:
+            result.append(produce(pipeline, stop))
+        except BaseException as e:
+            error.append(e)
+        finally:
+            pipeline.close()
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    while thread.is_alive():
+        if not alive():
+            stop.set()
+        item = pipeline.latest(timeout=poll)
+        if item is not None:
+            if not stop.is_set():  # ウィンドウが閉じられた後は描画しない
+                consume(*item)
+            pipeline.release(item[0])
+    thread.join()
+    if error:
+        raise error[0]
+    return result[0] if result else None
+
+
+if __name__ == '__main__':
+    import time
+
+    # 描画が遅くても計算は待たず、間に合わないフレームは捨てられる
+    def produce(pipeline, stop):
+        frame = np.zeros((256, 256))
+        for i in range(200):
+            frame += 1
+            pipeline.publish(frame, i)
+            time.sleep(0.001)
+        return i + 1
+
+    pipeline = FramePipeline((256, 256))
+    start = time.perf_counter()
+    n = run_pipeline(produce, pipeline, lambda frame, info: time.sleep(0.02))
+    print("{} frames in {:.2f} s: {} shown, {} dropped".format(
+        n, time.perf_counter() - start, pipeline.delivered, pipeline.dropped))
+
+    # 計算が例外を送出したら、止まらずに呼び出し側で同じ例外が送出される
+    def failing(pipeline, stop):
+        pipeline.publish(np.zeros((256, 256)))
+        raise RuntimeError("solver failed")
+
+    try:
+        run_pipeline(failing, FramePipeline((256, 256)), lambda frame, info: None)
+    except RuntimeError as e:
+        print("producer error re-raised:", e)
+    else:
+        raise AssertionError("producer error was not re-raised")
@@ -6,12 +6,13 @@ sys.path.append(os.pardir)
 import numpy as np
 from alifebook_lib.visualizers import MatrixVisualizer
 import time  # アニメーション速度調整のため
-
-# visualizerの初期化
-visualizer = MatrixVisualizer()
+from cp_game_of_life_engine import allocate_buffers, step
+import cp_game_of_life_bitpacked as bitpacked
 
 WIDTH = 50
 HEIGHT = 50
+# 計算方法 ("int8": np.int8 の配列, "bitpacked": 1ワードに64セルを詰めた配列 (巨大な空間向け))
+BACKEND = "int8"
 
 def initialize_state(pattern_type="random"):
     """
@@ -88,25 +89,27 @@ if __name__ == "__main__": # おまじない。このファイルを直接実行
     state = initialize_state(initial_pattern)
     next_state = np.empty((HEIGHT, WIDTH), dtype=np.int8)
 
+    # visualizerの初期化 (他のファイルから初期パターンだけを読み込んだ場合にウィンドウが開かないよう、ここで行う)
+    visualizer = MatrixVisualizer()
+    # 近傍の和を計算するための作業配列 (ループ内で使い回す)
+    if BACKEND == "bitpacked":
+        words = bitpacked.pack(state)
+        next_words = np.empty_like(words)
+        work = bitpacked.allocate_work(words.shape)
+    else:
+        buffers = allocate_buffers((HEIGHT, WIDTH))
+
     while visualizer:
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                nw = state[i-1,j-1]
-                n  = state[i-1,j]
-                ne = state[i-1,(j+1)%WIDTH]
-                w  = state[i,j-1]
-                c  = state[i,j]
-                e  = state[i,(j+1)%WIDTH]
-                sw = state[(i+1)%HEIGHT,j-1]
-                s  = state[(i+1)%HEIGHT,j]
-                se = state[(i+1)%HEIGHT,(j+1)%WIDTH]
-                neighbor_cell_sum = nw + n + ne + w + e + sw + s + se
-                if c == 0 and neighbor_cell_sum == 3:
-                    next_state[i,j] = 1
-                elif c == 1 and neighbor_cell_sum in (2,3):
-                    next_state[i,j] = 1
-                else:
-                    next_state[i,j] = 0
-        state, next_state = next_state, state
+        if BACKEND == "bitpacked":
+            # 近傍の8セルをずらしたワード列の全加算器で数える (cp_game_of_life_bitpacked.py参照)
+            bitpacked.step_packed(words, next_words, WIDTH, work)
+            words, next_words = next_words, words
+            bitpacked.unpack(words, WIDTH, out=state)  # 表示用に np.int8 の配列に展開
+        else:
+            # 全てのセルの近傍の和を配列の演算でまとめて計算し (cp_game_of_life_engine.py参照)、
+            # c == 0 and neighbor_cell_sum == 3 ならば誕生、
+            # c == 1 and neighbor_cell_sum in (2,3) ならば生存、それ以外は0とする。
+            step(state, next_state, buffers=buffers)
+            state, next_state = next_state, state
         visualizer.update(1-state)
         time.sleep(0.1)  # アニメーション速度を調整 (0.1秒間隔)
@@ -4,109 +4,91 @@
 import sys, os
 sys.path.append(os.pardir)
 import numpy as np
-from alifebook_lib.visualizers import MatrixVisualizer
+from alifebook_lib.visualizers import SwarmVisualizer
 import time  # アニメーション速度調整のため
+from cp_game_of_life_engine import allocate_buffers, fill_periodic_halo, make_life_table
 
-# visualizerの初期化
-visualizer = MatrixVisualizer()
+DEPTH = 128
+HEIGHT = 128
+WIDTH = 128
+
+# 3次元ライフゲームのルール (Bays の記法 "E_l E_u F_l F_u")
+# 生きているセルは周りの26セルのうち E_l 以上 E_u 以下が生きていれば生存し、
+# 死んでいるセルは F_l 以上 F_u 以下が生きていれば誕生する。
+# 例) "4555": 4-5 で生存、5 で誕生  "5766": 5-7 で生存、6 で誕生
+RULE = "4555"
+
+# 初期状態のランダムなセルを置く、中央の立方体の一辺と密度
+SOUP_SIZE = 32
+SOUP_DENSITY = 0.3
+
+
+def parse_rule(rule):
+    """
+    Bays の記法 "E_l E_u F_l F_u" (例: "4555") を (誕生, 生存) の近傍数の集合に変換する関数。
+    2桁以上の数を使う場合は "4,5,5,5" のようにカンマで区切る。
+    """
+    values = [int(v) for v in (rule.split(",") if "," in rule else rule)]
+    e_l, e_u, f_l, f_u = values
+    return set(range(f_l, f_u + 1)), set(range(e_l, e_u + 1))
+
+
+def step(state, next_state, table, buffers):
+    """
+    周期境界条件で3次元ライフゲームを1ステップ更新し、結果を next_state に書き込む関数。
+    table は make_life_table(..., ndim=3)、buffers は allocate_buffers(shape, ndim=3) で作る。
+    中央を含む 3x3x3 の27セルの和を、x, y, z 方向の順に3セルずつ足して計算する
+    (足し算は26回ではなく6回で済む)。
+    """
+    if table.shape != (28, 2):
+        raise ValueError("rule table of shape {} is not a 2-state 3D (3x3x3) table".format(table.shape))
+    padded, sum_x, sum_xy, code = buffers
+    padded[1:-1, 1:-1, 1:-1] = state
+    fill_periodic_halo(padded, ndim=3)
+    np.add(padded[:, :, :-2], padded[:, :, 1:-1], out=sum_x)
+    sum_x += padded[:, :, 2:]
+    np.add(sum_x[:, :-2, :], sum_x[:, 1:-1, :], out=sum_xy)
+    sum_xy += sum_x[:, 2:, :]
+    np.add(sum_xy[:-2], sum_xy[1:-1], out=code)
+    code += sum_xy[2:]
+    code <<= 1
+    code += state
+    np.take(table, code, out=next_state, mode='clip')
+    return next_state
 
-WIDTH = 50
-HEIGHT = 50
 
 def initialize_state(pattern_type="random"):
     """
-    ライフゲームの状態を初期化する関数。
+    3次元ライフゲームの状態を初期化する関数。
 
     引数:
-    pattern_type (str): 初期パターンの種類 ("random", "static", "oscillator", "glider", "glider_gun")。
-                        デフォルトは "random"。
+    pattern_type (str): 初期パターンの種類 ("random": 中央の SOUP_SIZE の立方体にランダムに置く)。
     """
-    state = np.zeros((HEIGHT, WIDTH), dtype=np.int8)
-    if pattern_type == "random":
-        state = np.random.randint(2, size=(HEIGHT, WIDTH), dtype=np.int8)
-    elif pattern_type == "static":
-        pattern = STATIC
-        x_offset = (WIDTH - pattern.shape[1]) // 2  # 中央に配置
-        y_offset = (HEIGHT - pattern.shape[0]) // 2 # 中央に配置
-        state[y_offset:y_offset+pattern.shape[0], x_offset:x_offset+pattern.shape[1]] = pattern
-    elif pattern_type == "oscillator":
-        pattern = OSCILLATOR
-        x_offset = (WIDTH - pattern.shape[1]) // 2
-        y_offset = (HEIGHT - pattern.shape[0]) // 2
-        state[y_offset:y_offset+pattern.shape[0], x_offset:x_offset+pattern.shape[1]] = pattern
-    elif pattern_type == "glider":
-        pattern = GLIDER
-        x_offset = (WIDTH - pattern.shape[1]) // 2
-        y_offset = (HEIGHT - pattern.shape[0]) // 2
-        state[y_offset:y_offset+pattern.shape[0], x_offset:x_offset+pattern.shape[1]] = pattern
-    elif pattern_type == "glider_gun":
-        pattern = GLIDER_GUN
-        x_offset = (WIDTH - pattern.shape[1]) // 2
-        y_offset = (HEIGHT - pattern.shape[0]) // 2
-        state[y_offset:y_offset+pattern.shape[0], x_offset:x_offset+pattern.shape[1]] = pattern
-    else:
+    state = np.zeros((DEPTH, HEIGHT, WIDTH), dtype=np.int8)
+    if pattern_type != "random":
         print("Invalid pattern_type. Initializing with random pattern.")
-        state = np.random.randint(2, size=(HEIGHT, WIDTH), dtype=np.int8)
+    z, y, x = [(n - SOUP_SIZE) // 2 for n in (DEPTH, HEIGHT, WIDTH)]
+    soup = np.random.rand(SOUP_SIZE, SOUP_SIZE, SOUP_SIZE) < SOUP_DENSITY
+    state[z:z+SOUP_SIZE, y:y+SOUP_SIZE, x:x+SOUP_SIZE] = soup
     return state
 
-# 初期パターンの定義 (まとめて記述)
-STATIC = np.array(
-    [[0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-     [1,1,0,0,0,1,1,0,0,0,0,1,1,0,0,0,1,1,0],
-     [1,1,0,0,1,0,0,1,0,0,1,0,0,1,0,0,1,0,1],
-     [0,0,0,0,0,1,1,0,0,0,0,1,0,1,0,0,0,1,0],
-     [0,0,0,0,0,0,0,0,0,0,0,0,1,0,0,0,0,0,0],
-    ])
-
-OSCILLATOR = np.array(
-    [[1,0,0,0,0,1,0,0],
-     [1,0,0,0,1,0,0,1],
-     [1,0,0,0,1,0,0,1],
-     [0,0,0,0,0,0,1,0]])
-
-GLIDER = np.array(
-    [[0,0,0,0],
-     [0,0,1,0],
-     [0,0,0,1],
-     [0,1,1,1]])
-
-GLIDER_GUN = np.array(
-    [[0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,0,0,0,0,0,0,0,0,0,0,0],
-     [0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,1,0,1,0,0,0,0,0,0,0,0,0,0,0],
-     [0,0,0,0,0,0,0,0,0,0,0,0,1,1,0,0,0,0,0,0,1,1,0,0,0,0,0,0,0,0,0,0,0,0,1,1],
-     [0,0,0,0,0,0,0,0,0,0,0,1,0,0,0,1,0,0,0,0,1,1,0,0,0,0,0,0,0,0,0,0,0,0,1,1],
-     [1,1,0,0,0,0,0,0,0,0,1,0,0,0,0,0,1,0,0,0,1,1,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-     [1,1,0,0,0,0,0,0,0,0,1,0,0,0,1,0,1,1,0,0,0,0,1,0,1,0,0,0,0,0,0,0,0,0,0,0],
-     [0,0,0,0,0,0,0,0,0,0,1,0,0,0,0,0,1,0,0,0,0,0,0,0,1,0,0,0,0,0,0,0,0,0,0,0],
-     [0,0,0,0,0,0,0,0,0,0,0,1,0,0,0,1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0],
-     [0,0,0,0,0,0,0,0,0,0,0,0,1,1,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0,0]])
-
 
 if __name__ == "__main__": # おまじない。このファイルを直接実行した場合のみ以下のコードが実行される
-    # 初期状態を選択 (例: "random", "static", "oscillator", "glider", "glider_gun")
-    initial_pattern = "glider"  # ここで初期パターンを選択
-    state = initialize_state(initial_pattern)
-    next_state = np.empty((HEIGHT, WIDTH), dtype=np.int8)
+    state = initialize_state("random")
+    next_state = np.empty((DEPTH, HEIGHT, WIDTH), dtype=np.int8)
+    table = make_life_table(*parse_rule(RULE), ndim=3)
+    buffers = allocate_buffers(state.shape, ndim=3)
+    # 生きたセルの座標を [-0.5, 0.5] の範囲に変換するための値
+    center = (np.array([DEPTH, HEIGHT, WIDTH]) - 1) / 2
+    scale = 1.0 / max(DEPTH, HEIGHT, WIDTH)
+
+    # visualizerの初期化 (生きたセルの座標だけを点として描く)
+    visualizer = SwarmVisualizer()
 
     while visualizer:
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                nw = state[i-1,j-1]
-                n  = state[i-1,j]
-                ne = state[i-1,(j+1)%WIDTH]
-                w  = state[i,j-1]
-                c  = state[i,j]
-                e  = state[i,(j+1)%WIDTH]
-                sw = state[(i+1)%HEIGHT,j-1]
-                s  = state[(i+1)%HEIGHT,j]
-                se = state[(i+1)%HEIGHT,(j+1)%WIDTH]
-                neighbor_cell_sum = nw + n + ne + w + e + sw + s + se
-                if c == 0 and neighbor_cell_sum == 3:
-                    next_state[i,j] = 1
-                elif c == 1 and neighbor_cell_sum in (2,3):
-                    next_state[i,j] = 1
-                else:
-                    next_state[i,j] = 0
+        step(state, next_state, table, buffers)
         state, next_state = next_state, state
-        visualizer.update(1-state)
-        time.sleep(0.1)  # アニメーション速度を調整 (0.1秒間隔)
+        position = (np.argwhere(state)[:, ::-1] - center[::-1]) * scale  # (x, y, z) の順
+        # 全てのセルが死んだときも、空の配列を渡して前のフレームの点を消す
+        visualizer.set_markers(position, size=4)
+        time.sleep(0.01)  # アニメーション速度を調整
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ビットパックしたライフゲーム (1ワードに64セル)
+
+各行を cp_ca_1d_bitpacked.py と同じ形式で np.uint64 のワード列に詰め、
+状態を (..., HEIGHT, n_words) の配列として保持する。
+近傍の8セルはそれぞれ、ワード列全体を縦・横に1セルずらした「面」として作り、
+全加算器 (full adder) のビット演算で近傍の数を数えて B3/S23 のルールを評価する。
+np.int8 の配列に比べてメモリは1/8で、1回のビット演算で64セルを同時に計算できる。
+横方向は WIDTH が64の倍数でない場合も周期境界条件を正しく扱う。
+"""
+
+import numpy as np
+from cp_ca_1d_bitpacked import pack, unpack, mask_padding, shift_from_left, shift_from_right
+
+__all__ = ['pack', 'unpack', 'allocate_work', 'step_packed']
+
+
+def allocate_work(shape):
+    """step_packed 用の作業配列 (8つの近傍の面と、加算器の一時領域) を確保する関数"""
+    return tuple(np.empty(shape, dtype=np.uint64) for _ in range(9))
+
+
+def _full_adder(a, b, c, tmp):
+    """
+    3つの面 a, b, c を足し、和のビットを a に、桁上がりのビットを b に書き込む関数。
+    和 = a ^ b ^ c、桁上がり = (a & b) | (c & (a ^ b))
+    """
+    np.bitwise_xor(a, b, out=tmp)
+    np.bitwise_and(a, b, out=b)
+    np.bitwise_xor(tmp, c, out=a)
+    tmp &= c
+    b |= tmp
+
+
+def step_packed(words, next_words, width, work=None):
+    """
+    ビットパックした状態を周期境界条件で1ステップ更新し、結果を next_words に書き込む関数。
+
+    引数:
+    words (np.ndarray): pack で作った現在の状態 (..., HEIGHT, n_words)。
+    next_words (np.ndarray): 次の状態を書き込む配列 (words と同じ形)。
+    width (int): 横のセルの数 (WIDTH)。
+    work (tuple): allocate_work で確保した作業配列。ループ内で使い回すと確保が不要になる。
+    """
+    if work is None:
+        work = allocate_work(words.shape)
+    nw, n, ne, w, e, sw, s, se, tmp = work
+
+    # 上下の行 (縦方向の周期境界条件)
+    n[..., 1:, :] = words[..., :-1, :]
+    n[..., 0, :] = words[..., -1, :]
+    s[..., :-1, :] = words[..., 1:, :]
+    s[..., -1, :] = words[..., 0, :]
+    # 左右のセル (横方向の周期境界条件)
+    shift_from_left(n, width, nw)
+    shift_from_right(n, width, ne)
+    shift_from_left(words, width, w)
+    shift_from_right(words, width, e)
+    shift_from_left(s, width, sw)
+    shift_from_right(s, width, se)
+
+    # 上の3セルと下の3セルをそれぞれ全加算器で、左右の2セルを半加算器で足す
+    _full_adder(nw, n, ne, tmp)  # nw: 上の和の1の位, n: 2の位
+    _full_adder(sw, s, se, tmp)  # sw: 下の和の1の位, s: 2の位
+    np.bitwise_and(w, e, out=ne)  # ne: 左右の和の2の位
+    w ^= e                        # w: 左右の和の1の位
+    # 1の位どうしを足す
+    _full_adder(nw, w, sw, tmp)  # nw: 近傍の数の1の位 (b0), w: 2の位への桁上がり
+    # 2の位どうしを足す
+    _full_adder(n, ne, s, tmp)   # n: 2の位, ne: 4の位への桁上がり
+    np.bitwise_and(n, w, out=se)
+    n ^= w                       # n: 近傍の数の2の位 (b1)
+    ne |= se                     # ne: 近傍の数が4以上
+
+    # 近傍の数が2か3 (b1 & ~4以上) で、3 (b0) または生きている場合に1
+    nw |= words
+    nw &= n
+    np.invert(ne, out=ne)
+    np.bitwise_and(nw, ne, out=next_words)
+    return mask_padding(next_words, width)
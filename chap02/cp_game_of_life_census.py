@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ライフゲームの落ち着いた状態に残った物体の調査 (census)
+
+1. 生きたセルを8近傍でつながった成分 (物体) に分ける (ラベル付け)。
+   (B, HEIGHT, WIDTH) の多数の状態をまとめて、配列演算だけで行う。
+2. 各物体を切り出し、回転・反転の8通りのうち最小のものを標準形 (canonical form) とする。
+3. 標準形ごとに数を数え、標準形をキーにした分類結果のキャッシュを使って
+   静物 (still life)・振動子 (oscillator)・宇宙船 (spaceship, グライダーなど) に分類する。
+   同じ形は一度しか分類しないので、多数の状態を調べても分類の計算はほとんど増えない。
+空間は cp_game_of_life.py と同じく周期境界として扱い、端をまたぐ物体も1つとして数える。
+"""
+
+from collections import Counter
+import numpy as np
+from cp_game_of_life_engine import LIFE_TABLE, step
+
+# 分類するときに調べる最大の周期
+MAX_PERIOD = 30
+
+_canonical_cache = {}  # 切り出したままの形 -> 標準形
+_classification_cache = {}  # (標準形, ルール表, 最大の周期) -> 分類結果
+
+
+def _max_pool(labels, out, periodic):
+    """周りの3x3のうち最大のラベルを out に書き込む (periodic が False なら空間の外は0とみなす)"""
+    np.copyto(out, labels)
+    for axis in (-2, -1):
+        source = out.copy()
+        if periodic:
+            np.maximum(out, np.roll(source, 1, axis=axis), out=out)
+            np.maximum(out, np.roll(source, -1, axis=axis), out=out)
+        elif axis == -2:
+            np.maximum(out[..., 1:, :], source[..., :-1, :], out=out[..., 1:, :])
+            np.maximum(out[..., :-1, :], source[..., 1:, :], out=out[..., :-1, :])
+        else:
+            np.maximum(out[..., :, 1:], source[..., :, :-1], out=out[..., :, 1:])
+            np.maximum(out[..., :, :-1], source[..., :, 1:], out=out[..., :, :-1])
+    return out
+
+
+def label_components(states, periodic=True):
+    """
+    8近傍でつながった生きたセルの成分にラベルを付ける関数。
+    ラベルの初期値を各セルの通し番号とし、周り3x3の最大値を取る操作と、
+    ラベルが指すセルのラベルに置き換える操作 (pointer jumping) を変化がなくなるまで繰り返す。
+
+    引数:
+    states (np.ndarray): (..., HEIGHT, WIDTH) の状態。1を生きたセルとする。
+    periodic (bool): True なら cp_game_of_life.py と同じく空間の端を周期境界としてつなげる。
+
+    戻り値:
+    states と同じ形のラベル (0 は死んだセル)。ラベルはバッチ全体で重ならない。
+    """
+    alive = states == 1
+    labels = np.where(alive, np.arange(1, alive.size + 1).reshape(alive.shape), 0)
+    flat = labels.reshape(-1)
+    pooled = np.empty_like(labels)
+    while True:
+        _max_pool(labels, pooled, periodic)
+        pooled *= alive
+        # pointer jumping: ラベルが指すセルのラベルを使う
+        np.maximum(pooled, flat[np.maximum(pooled, 1) - 1].reshape(labels.shape) * alive, out=pooled)
+        if np.array_equal(pooled, labels):
+            return labels
+        labels, pooled = pooled, labels
+        flat = labels.reshape(-1)
+
+
+def _unwrap(coords, inverse, n, size):
+    """
+    周期境界をまたぐ成分 (両端に接している成分) の座標を、size だけずらしてつながるようにする。
+    物体が空間の半分より十分小さいことを仮定している。
+    """
+    low = np.zeros(n, dtype=bool)
+    high = np.zeros(n, dtype=bool)
+    low[inverse[coords == 0]] = True
+    high[inverse[coords == size - 1]] = True
+    wrapped = (low & high)[inverse]
+    return np.where(wrapped & (coords < size // 2), coords + size, coords)
+
+
+def extract_components(states, labels=None, periodic=True):
+    """
+    各成分を、それを囲む最小の長方形で切り出す関数。
+
+    戻り値:
+    (バッチの添字, 0/1 の np.uint8 の配列) のリスト。
+    """
+    if labels is None:
+        labels = label_components(states, periodic)
+    height, width = labels.shape[-2:]
+    labels = labels.reshape((-1, height, width))
+    b, y, x = np.nonzero(labels)
+    ids, inverse = np.unique(labels[b, y, x], return_inverse=True)
+    n = len(ids)
+    if periodic:
+        y = _unwrap(y, inverse, n, height)
+        x = _unwrap(x, inverse, n, width)
+    # 成分ごとにセルをまとめ、外接長方形の中に並べる
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(n + 1))
+    components = []
+    for i in range(n):
+        cells = order[starts[i]:starts[i+1]]
+        ys, xs = y[cells], x[cells]
+        y0, x0 = ys.min(), xs.min()
+        crop = np.zeros((ys.max() - y0 + 1, xs.max() - x0 + 1), dtype=np.uint8)
+        crop[ys - y0, xs - x0] = 1
+        components.append((int(b[cells[0]]), crop))
+    return components
+
+
+def _key(cells):
+    return "{}x{}_{}".format(cells.shape[0], cells.shape[1], np.packbits(cells).tobytes().hex())
+
+
+def canonical_form(cells):
+    """
+    回転・反転の8通りのうち、(高さ, 幅, セルの並び) が最小になるものを文字列のキーとして返す関数。
+    同じ切り出し方の形は一度しか計算しない。
+    """
+    raw = _key(cells)
+    key = _canonical_cache.get(raw)
+    if key is None:
+        forms = []
+        for k in range(4):
+            rotated = np.rot90(cells, k)
+            forms.append(rotated)
+            forms.append(rotated[:, ::-1])
+        best = min(forms, key=lambda f: (f.shape, np.packbits(f).tobytes()))
+        key = _key(np.ascontiguousarray(best))
+        _canonical_cache[raw] = key
+    return key
+
+
+def key_to_cells(key):
+    """canonical_form のキーから0/1の配列を復元する関数"""
+    size, data = key.split("_")
+    height, width = [int(v) for v in size.split("x")]
+    bits = np.unpackbits(np.frombuffer(bytes.fromhex(data), dtype=np.uint8), count=height * width)
+    return bits.reshape(height, width)
+
+
+def _crop(state):
+    # state は次の世代の計算で書き換えられるので、ビューではなくコピーを返す
+    ys, xs = np.nonzero(state)
+    return (ys.min(), xs.min()), state[ys.min():ys.max()+1, xs.min():xs.max()+1].copy()
+
+
+def classify(key, max_period=MAX_PERIOD, table=LIFE_TABLE):
+    """
+    標準形 key の物体を単独で max_period 世代まで計算し、分類する関数 (結果はキャッシュする)。
+
+    戻り値:
+    dict。"kind" は "still_life", "oscillator", "spaceship", "dies", "unknown" のいずれか、
+    "period" は周期 (分からなければ 0)、"displacement" は1周期で移動する量 (dy, dx)、
+    "name" は B3/S23 のよく知られた物体ならその名前、それ以外は key。
+    """
+    table = np.asarray(table)
+    cache_key = (key, table.tobytes(), max_period)
+    result = _classification_cache.get(cache_key)
+    if result is not None:
+        return result
+    cells = key_to_cells(key).astype(np.int8)
+    margin = max_period + 2
+    state = np.zeros((cells.shape[0] + 2*margin, cells.shape[1] + 2*margin), dtype=np.int8)
+    state[margin:margin+cells.shape[0], margin:margin+cells.shape[1]] = cells
+    next_state = np.empty_like(state)
+    origin, shape = _crop(state)
+    result = {"kind": "unknown", "period": 0, "displacement": (0, 0)}
+    for p in range(1, max_period + 1):
+        step(state, next_state, table)
+        state, next_state = next_state, state
+        if not state.any():
+            result = {"kind": "dies", "period": 0, "displacement": (0, 0)}
+            break
+        position, current = _crop(state)
+        if current.shape == shape.shape and np.array_equal(current, shape):
+            displacement = (int(position[0] - origin[0]), int(position[1] - origin[1]))
+            if displacement == (0, 0):
+                kind = "still_life" if p == 1 else "oscillator"
+            else:
+                kind = "spaceship"
+            result = {"kind": kind, "period": p, "displacement": displacement}
+            break
+    # KNOWN_OBJECTS の名前は B3/S23 の物体なので、他のルールでは使わない
+    result["name"] = KNOWN_OBJECTS.get(key, key) if np.array_equal(table, LIFE_TABLE) else key
+    _classification_cache[cache_key] = result
+    return result
+
+
+def census(states, table=LIFE_TABLE, periodic=True):
+    """
+    states (..., HEIGHT, WIDTH) に含まれる物体を数える関数。
+    periodic が True なら、周期境界をまたぐ物体も1つの物体として数える。
+
+    戻り値:
+    (標準形ごとの数の Counter, 名前ごとの数の Counter, 種類ごとの数の Counter)
+    """
+    by_key = Counter(canonical_form(cells) for _, cells in extract_components(states, periodic=periodic))
+    by_name = Counter()
+    by_kind = Counter()
+    for key, count in by_key.items():
+        result = classify(key, table=table)
+        by_name[result["name"]] += count
+        by_kind[result["kind"]] += count
+    return by_key, by_name, by_kind
+
+
+def _register(name, cells, phases=1):
+    """よく知られた物体の全ての位相の標準形を KNOWN_OBJECTS に登録する"""
+    cells = np.array(cells, dtype=np.int8)
+    state = np.zeros((cells.shape[0] + 8, cells.shape[1] + 8), dtype=np.int8)
+    state[4:-4, 4:-4] = cells
+    for _ in range(phases):
+        KNOWN_OBJECTS[canonical_form(_crop(state)[1].astype(np.uint8))] = name
+        state = step(state, np.empty_like(state))
+
+KNOWN_OBJECTS = {}
+_register("block", [[1,1],[1,1]])
+_register("beehive", [[0,1,1,0],[1,0,0,1],[0,1,1,0]])
+_register("loaf", [[0,1,1,0],[1,0,0,1],[0,1,0,1],[0,0,1,0]])
+_register("boat", [[1,1,0],[1,0,1],[0,1,0]])
+_register("ship", [[1,1,0],[1,0,1],[0,1,1]])
+_register("tub", [[0,1,0],[1,0,1],[0,1,0]])
+_register("pond", [[0,1,1,0],[1,0,0,1],[1,0,0,1],[0,1,1,0]])
+_register("blinker", [[1,1,1]], phases=2)
+_register("toad", [[0,1,1,1],[1,1,1,0]], phases=2)
+_register("beacon", [[1,1,0,0],[1,1,0,0],[0,0,1,1],[0,0,1,1]], phases=2)
+_register("glider", [[0,1,0],[0,0,1],[1,1,1]], phases=4)
+
+
+if __name__ == '__main__':
+    import time
+    from cp_game_of_life_soups import random_soups, run_soups
+
+    # よく知られた物体が、正しい周期と移動量に分類されることを確かめる
+    PULSAR_QUADRANT = [[0,0,1,1,1,0],[0,0,0,0,0,0],[1,0,0,0,0,1],[1,0,0,0,0,1],[1,0,0,0,0,1],[0,0,1,1,1,0]]
+    pulsar = np.zeros((13, 13), dtype=np.uint8)
+    pulsar[:6, :6] = PULSAR_QUADRANT
+    pulsar[:6, 7:] = pulsar[:6, 5::-1]
+    pulsar[7:] = pulsar[5::-1]
+    EXPECTED = [
+        ("blinker", [[1,1,1]], 2, (0, 0)),
+        ("glider", [[0,1,0],[0,0,1],[1,1,1]], 4, (1, 1)),
+        ("pulsar", pulsar, 3, (0, 0)),
+        ("pentadecathlon", [[0,0,1,0,0,0,0,1,0,0],[1,1,0,1,1,1,1,0,1,1],[0,0,1,0,0,0,0,1,0,0]], 15, (0, 0)),
+    ]
+    for name, cells, period, displacement in EXPECTED:
+        result = classify(canonical_form(np.array(cells, dtype=np.uint8)))
+        moved = tuple(abs(d) for d in result["displacement"])
+        assert (result["period"], moved) == (period, displacement), (name, result)
+        print("{:>14s}: {} (period {}, displacement {})".format(name, result["kind"], result["period"], moved))
+
+    N_SOUPS = 2000
+    soups = random_soups(N_SOUPS, seed=0)
+    start = time.perf_counter()
+    final, _ = run_soups("B3/S23", soups, generations=1000)
+    print("simulation: {:.1f} s".format(time.perf_counter() - start))
+    start = time.perf_counter()
+    by_key, by_name, by_kind = census(final)
+    print("census    : {:.1f} s".format(time.perf_counter() - start))
+    print(dict(by_kind))
+    for name, count in by_name.most_common(20):
+        print("{:>12s}: {}".format(name, count))
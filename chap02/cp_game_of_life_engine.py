@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ライフゲームの計算エンジン
+
+cp_game_of_life.py ではセルごとに二重の for ループで近傍の8セルを読んでいたが、
+ここでは周期境界条件のための1セル分の「のりしろ」(ゴーストセル) を付けた配列を用意し、
+配列のスライスの足し算で全てのセルの近傍の和を一度に計算する。
+作業配列は allocate_buffers で確保しておき、ループ内で使い回す。
+最後の2軸を (HEIGHT, WIDTH) とみなし、それより前の軸はバッチとして扱う。
+ルールは B3/S23 以外の B/S 記法や、多状態の Generations 型のルールも扱える (parse_rule)。
+"""
+
+import numpy as np
+
+
+def make_life_table(birth=(3,), survival=(2, 3), n_states=2, ndim=2):
+    """
+    誕生・生存の条件からルールテーブルを作る関数。
+    テーブルの形は (中央を含む近傍のセルの数 + 1, n_states) で、
+    table[中央を含む9セルのうち生きたセルの数, 中央のセルの状態] が次の状態になる。
+    平らにした添字は n_states * (生きたセルの数) + 中央のセルの状態 (np.take ではこちらを使う)。
+    ndim=3 なら中央を含む 3x3x3 の27セル (cp_game_of_life_3d.py)。
+
+    引数:
+    birth (tuple): 死んでいるセルが誕生する、周りの生きたセルの数。
+    survival (tuple): 生きているセルが生存する、周りの生きたセルの数。
+    n_states (int): 状態の数。3以上の場合は Generations 型のルールになり、
+                    生存できなかったセルは 2, 3, ..., n_states-1 と「老化」してから 0 に戻る。
+                    近傍として数えるのは状態 1 (生きている) のセルだけ。
+    ndim (int): 空間の次元。
+    """
+    n_cells = 3**ndim  # 中央を含む近傍のセルの数
+    table = np.zeros((n_cells + 1, n_states), dtype=np.int8)
+    for s in range(n_states):
+        for total in range(n_cells + 1):
+            n = total - (s == 1)  # 中央のセルを除いた、周りの生きたセルの数
+            if s == 0:
+                value = 1 if n in birth else 0
+            elif s == 1:
+                value = 1 if n in survival else 2 % n_states
+            else:
+                value = (s + 1) % n_states
+            table[total, s] = value
+    return table
+
+
+def parse_rule(rule):
+    """
+    ルールの文字列を (誕生, 生存, 状態の数) に変換する関数。
+    以下の書き方に対応する。
+      "B3/S23"          B/S 記法 (ライフゲーム)
+      "B2/S/C3"         B/S 記法の Generations ("C" の代わりに "G" も可)
+      "23/3"            S/B 記法
+      "345/2/4"         S/B/C 記法 (Generations)
+    """
+    parts = rule.upper().replace(" ", "").split("/")
+    if parts[0].startswith("B") or parts[0].startswith("S"):
+        fields = {part[0]: part[1:] for part in parts if part}
+        birth, survival, n_states = fields.get("B", ""), fields.get("S", ""), fields.get("C", fields.get("G", "2"))
+    else:
+        survival, birth = parts[0], parts[1]
+        n_states = parts[2] if len(parts) > 2 else "2"
+    return (tuple(int(c) for c in birth), tuple(int(c) for c in survival), int(n_states))
+
+
+def make_rule_table(rule):
+    """ルールの文字列 (parse_rule 参照) からルールテーブルを作る関数"""
+    return make_life_table(*parse_rule(rule))
+
+# 通常のライフゲーム (B3/S23)
+LIFE_TABLE = make_life_table()
+
+
+def allocate_buffers(shape, ndim=2):
+    """
+    step 用の作業配列を確保する関数。最後の ndim 軸を空間とみなす。
+
+    戻り値:
+    (のりしろ付きの状態 (..., HEIGHT+2, WIDTH+2),
+     横方向の3セルの和 (..., HEIGHT+2, WIDTH),
+     ルールテーブルの添字 (..., HEIGHT, WIDTH))
+    ndim=3 なら (のりしろ付きの状態 (..., DEPTH+2, HEIGHT+2, WIDTH+2),
+     x 方向の3セルの和 (..., DEPTH+2, HEIGHT+2, WIDTH), xy 方向の9セルの和 (..., DEPTH+2, HEIGHT, WIDTH),
+     ルールテーブルの添字 (..., DEPTH, HEIGHT, WIDTH))。
+    """
+    shape = tuple(shape)
+    batch, space = shape[:-ndim], shape[-ndim:]
+    padded = np.zeros(batch + tuple(n + 2 for n in space), dtype=np.int8)
+    # 後ろの軸から順に3セルずつ足した和 (最後の軸方向の和が先)
+    partial_sums = [np.empty(batch + tuple(n + 2 for n in space[:i]) + space[i:], dtype=np.int8)
+                    for i in range(ndim - 1, 0, -1)]
+    code = np.empty(shape, dtype=np.intp)
+    return (padded,) + tuple(partial_sums) + (code,)
+
+
+def fill_periodic_halo(padded, ndim=2):
+    """
+    のりしろ付きの配列の最後の ndim 軸について、
+    のりしろに反対側の端のセルをコピーする (周期境界条件) 関数。
+    軸ごとに順にコピーするので、角ののりしろも正しく埋まる。
+    """
+    for axis in range(padded.ndim - ndim, padded.ndim):
+        index = [slice(None)] * padded.ndim
+        index[axis] = 0
+        source = list(index)
+        source[axis] = -2
+        padded[tuple(index)] = padded[tuple(source)]
+        index[axis] = -1
+        source[axis] = 1
+        padded[tuple(index)] = padded[tuple(source)]
+    return padded
+
+
+def neighbor_sum(padded, row_sum, out):
+    """
+    のりしろ付きの配列から、各セルについて中央を含む 3x3 の9セルの和を計算する関数。
+    横方向の3セルの和を求めてから縦方向に3行足すので、足し算は4回で済む。
+    """
+    np.add(padded[..., :, :-2], padded[..., :, 1:-1], out=row_sum)
+    row_sum += padded[..., :, 2:]
+    np.add(row_sum[..., :-2, :], row_sum[..., 1:-1, :], out=out)
+    out += row_sum[..., 2:, :]
+    return out
+
+
+def _check_table(table):
+    """
+    ルールテーブルが2次元の近傍 (中央を含む9セル) のものか確かめ、状態の数を返す関数。
+    3次元のテーブル (make_life_table(..., ndim=3)) を渡すと、添字がずれて誤った結果になるため。
+    """
+    if table.ndim != 2 or table.shape[0] != 10:
+        raise ValueError("rule table of shape {} is not for the 2D (3x3) neighborhood; "
+                         "use make_life_table(..., ndim=2)".format(table.shape))
+    return table.shape[1]
+
+
+def step_from_padded(padded, next_state, table=LIFE_TABLE, buffers=None, state=None):
+    """
+    のりしろが埋まった配列から1ステップ分の更新を行い、next_state に書き込む関数。
+    周期境界条件以外 (並列計算での隣の領域や、無限に広い平面など) でのりしろを埋めた場合に使う。
+    padded には生きている (状態1の) セルを1、それ以外を0として入れる。
+    状態が3つ以上のルールでは、中央のセルの状態 state も与える。
+    """
+    if buffers is None:
+        buffers = allocate_buffers(next_state.shape)
+    _, row_sum, code = buffers
+    n_states = _check_table(table)
+    neighbor_sum(padded, row_sum, code)
+    code *= n_states
+    code += padded[..., 1:-1, 1:-1] if state is None else state
+    np.take(table, code, out=next_state, mode='clip')
+    return next_state
+
+
+def step(state, next_state, table=LIFE_TABLE, buffers=None):
+    """
+    周期境界条件でライフゲームを1ステップ更新し、結果を next_state に書き込む関数。
+
+    引数:
+    state (np.ndarray): 現在の状態 (np.int8)。形は (HEIGHT, WIDTH) または (バッチ, HEIGHT, WIDTH)。
+                        バッチの場合は独立な複数の空間を1回の呼び出しでまとめて計算する。
+    next_state (np.ndarray): 次の状態を書き込む配列 (state と同じ形、同じ dtype)。
+    table (np.ndarray): ルールテーブル (make_life_table, make_rule_table)。
+    buffers (tuple): allocate_buffers で確保した作業配列。ループ内で使い回すと確保が不要になる。
+    """
+    if buffers is None:
+        buffers = allocate_buffers(state.shape)
+    padded = buffers[0]
+    if _check_table(table) == 2:
+        padded[..., 1:-1, 1:-1] = state
+        fill_periodic_halo(padded)
+        return step_from_padded(padded, next_state, table, buffers)
+    # Generations 型のルールでは、状態1のセルだけを近傍として数える
+    np.equal(state, 1, out=padded[..., 1:-1, 1:-1])
+    fill_periodic_halo(padded)
+    return step_from_padded(padded, next_state, table, buffers, state)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+複数のプロセスで並列に計算するライフゲーム (領域分割)
+
+周期境界条件の空間を横長の帯 (strip) に分け、帯ごとに1つのプロセスが計算する。
+帯の分割、共有メモリ、バリアとハロー交換は cp_strip_parallel.py にまとめてあり、
+ここでは各帯の1世代の計算 (カーネル) だけを与える。
+ルールは cp_game_of_life.py と同じ (cp_game_of_life_engine.py)。
+"""
+
+import time
+import numpy as np
+from cp_game_of_life_engine import LIFE_TABLE, allocate_buffers, fill_periodic_halo, step, step_from_padded
+from cp_strip_parallel import run_strips, scaling_table
+
+
+def _setup(rows, start, end, width, table):
+    """帯ごとのカーネルを作る (cp_strip_parallel.run_strips の setup)"""
+    buffers = allocate_buffers((rows, width))
+    padded = buffers[0]
+
+    def kernel(cur, nxt):
+        # 上下ののりしろは交換済みなので、左右だけ周期境界条件で埋めて計算する
+        padded[:, 1:-1] = cur[0]
+        fill_periodic_halo(padded, ndim=1)
+        step_from_padded(padded, nxt[0, 1:-1], table, buffers)
+    return kernel
+
+
+def run_parallel(state, generations, n_workers, table=LIFE_TABLE):
+    """
+    state (HEIGHT, WIDTH) を n_workers 個のプロセスで generations 世代計算する関数。
+
+    戻り値:
+    (最後の状態, 計算にかかった時間 (秒))
+    """
+    result, elapsed = run_strips(state[np.newaxis], generations, n_workers, _setup, (state.shape[1], table))
+    return result[0], elapsed
+
+
+def strong_scaling(height=2048, width=2048, generations=100, max_workers=None, seed=0):
+    """
+    同じ問題を1からmax_workers個のプロセスで計算し、時間と速度向上率を表示する関数。
+    結果が1プロセスの計算 (cp_game_of_life_engine.step) と完全に一致することも確認する。
+    """
+    state = np.random.RandomState(seed).randint(2, size=(height, width)).astype(np.int8)
+
+    reference = state.copy()
+    next_state = np.empty_like(reference)
+    buffers = allocate_buffers(reference.shape)
+    start = time.perf_counter()
+    for _ in range(generations):
+        step(reference, next_state, buffers=buffers)
+        reference, next_state = next_state, reference
+    serial = time.perf_counter() - start
+    print("serial   : {:.3f} s".format(serial))
+
+    def run(n):
+        result, elapsed = run_parallel(state, generations, n)
+        assert np.array_equal(result, reference)
+        return elapsed
+    return serial, scaling_table(run, max_workers)
+
+
+if __name__ == '__main__':
+    strong_scaling()
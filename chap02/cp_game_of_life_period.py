@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ライフゲームの周期状態の検出と、落ち着いた時点での計算の打ち切り
+
+多数の soup をまとめて計算すると、ほとんどの時間は既に周期的になった状態の計算に使われる。
+そこで各世代の状態のハッシュ値を直近 max_period 世代分だけ輪状のバッファに記録し、
+p 世代前と同じハッシュ値になったら周期 p の状態に入った (落ち着いた) とみなす。
+最初に一致した世代を t とすると、周期に入るまでの世代数 (transient) は t - p になる。
+
+ハッシュ値は、各セル (バイト) にランダムな64ビットの重みを掛けて足し合わせたもの。
+足し算なので、タイルごとのハッシュ値を足せば空間全体のハッシュ値になる。
+tile_size を指定するとタイルごとのハッシュ値を全て比べるので、偶然の一致がさらに起きにくくなる。
+周期境界条件なのでグライダーも空間を一周すると元に戻り、周期 4 * max(HEIGHT, WIDTH) 程度の状態になる。
+"""
+
+import numpy as np
+from cp_game_of_life_engine import LIFE_TABLE, allocate_buffers, step
+
+# 検出する最大の周期 (64x64 の空間をグライダーが一周する 256 世代を含むように)
+MAX_PERIOD = 300
+# 打ち切らない場合の最大の世代数
+MAX_GENERATIONS = 5000
+
+
+class PeriodDetector(object):
+    """
+    (B, HEIGHT, WIDTH) の状態のハッシュ値を世代ごとに記録し、周期を検出するクラス。
+    """
+    def __init__(self, shape, n_batch, max_period=MAX_PERIOD, tile_size=None, binary=True, seed=0):
+        """
+        引数:
+        shape (tuple): 1つの空間の形 (HEIGHT, WIDTH)。
+        n_batch (int): バッチの大きさ B。
+        max_period (int): 検出する最大の周期。
+        tile_size (int): タイルの一辺 (None なら空間全体で1つのハッシュ値)。
+        binary (bool): 状態が 0/1 だけなら True。8セルを1バイトに詰めてからハッシュ値を計算する。
+        """
+        height, width = shape
+        # np.packbits は行の最後のバイトを 0 で埋めるので、空間全体なら幅が 8 の倍数でなくてもよい
+        row_bytes = -(-width // 8) if binary else width
+        if tile_size is None:
+            self.tiles = (1, height, 1, row_bytes)
+        else:
+            if height % tile_size or width % tile_size or (binary and tile_size % 8):
+                raise ValueError("tile_size must divide the grid (and be a multiple of 8 for binary states)")
+            bytes_x = tile_size // 8 if binary else tile_size
+            self.tiles = (height // tile_size, tile_size, width // tile_size, bytes_x)
+        self.binary = binary
+        self.weights = np.random.default_rng(seed).integers(
+            0, 2**64 - 1, size=(height, row_bytes), dtype=np.uint64, endpoint=True)
+        self.max_period = max_period
+        self.history = np.zeros((max_period, n_batch, self.tiles[0] * self.tiles[2]), dtype=np.uint64)
+        self.position = 0
+        self.count = 0
+
+    def hash(self, states):
+        """各空間のタイルごとのハッシュ値 (B, タイルの数) を計算する"""
+        data = np.packbits(states, axis=-1) if self.binary else states.view(np.uint8)
+        products = data.astype(np.uint64)
+        products *= self.weights
+        n_batch = len(states)
+        return products.reshape((n_batch,) + self.tiles).sum(axis=(2, 4), dtype=np.uint64).reshape(n_batch, -1)
+
+    def update(self, states):
+        """
+        現在の状態を記録し、周期を返す。
+
+        戻り値:
+        (B,) の配列。p 世代前と同じ状態であれば最小の p、なければ 0。
+        """
+        current = self.hash(states)
+        lags = min(self.count, self.max_period)
+        period = np.zeros(len(states), dtype=np.int64)
+        if lags > 0:
+            # 1, 2, ..., lags 世代前のハッシュ値と比べる
+            index = (self.position - 1 - np.arange(lags)) % self.max_period
+            matches = (self.history[index] == current).all(axis=-1)
+            found = matches.any(axis=0)
+            period[found] = matches[:, found].argmax(axis=0) + 1
+        self.history[self.position] = current
+        self.position = (self.position + 1) % self.max_period
+        self.count += 1
+        return period
+
+    def keep(self, mask):
+        """バッチのうち mask が True のものだけを残す (落ち着いた空間を取り除く)"""
+        self.history = self.history[:, mask]
+
+
+def run_until_settled(states, table=LIFE_TABLE, max_generations=MAX_GENERATIONS,
+                      max_period=MAX_PERIOD, tile_size=None, seed=0):
+    """
+    states (B, HEIGHT, WIDTH) を、それぞれが周期的な状態に落ち着くまで計算する関数。
+    落ち着いた空間はバッチから取り除き、残りの空間だけを計算し続ける。
+    全ての空間が落ち着くか、max_generations 世代に達したら終了する。
+
+    戻り値:
+    (最後の状態 (B, HEIGHT, WIDTH), 周期 (B,), 周期に入るまでの世代数 (B,))。
+    落ち着いた空間の最後の状態は、周期を検出した世代のもの。
+    max_generations 世代までに落ち着かなかった空間は、周期 0、世代数 -1 とする。
+    """
+    n_batch = len(states)
+    final = states.copy()
+    period = np.zeros(n_batch, dtype=np.int64)
+    transient = np.full(n_batch, -1, dtype=np.int64)
+    index = np.arange(n_batch)  # 計算中の空間の、元のバッチでの添字
+    state = states.copy()
+    next_state = np.empty_like(state)
+    buffers = allocate_buffers(state.shape)
+    detector = PeriodDetector(state.shape[1:], n_batch, max_period, tile_size, table.shape[1] == 2, seed)
+    for t in range(max_generations + 1):
+        if t > 0:
+            step(state, next_state, table, buffers)
+            state, next_state = next_state, state
+        found = detector.update(state)
+        settled = found > 0
+        if settled.any():
+            final[index[settled]] = state[settled]
+            period[index[settled]] = found[settled]
+            transient[index[settled]] = t - found[settled]
+            remain = ~settled
+            index = index[remain]
+            state = state[remain]
+            next_state = np.empty_like(state)
+            buffers = allocate_buffers(state.shape)
+            detector.keep(remain)
+            if len(index) == 0:
+                break
+    final[index] = state
+    return final, period, transient
+
+
+if __name__ == '__main__':
+    import time
+    from cp_game_of_life_soups import random_soups, run_soups
+
+    N_SOUPS = 1000
+    soups = random_soups(N_SOUPS, seed=0)
+    start = time.perf_counter()
+    final, period, transient = run_until_settled(soups)
+    print("run_until_settled: {:.1f} s".format(time.perf_counter() - start))
+    settled = period > 0
+    print("settled: {} / {}".format(settled.sum(), N_SOUPS))
+    print("transient: mean {:.1f}, max {}".format(transient[settled].mean(), transient[settled].max()))
+    values, counts = np.unique(period[settled], return_counts=True)
+    print("periods:", {int(v): int(c) for v, c in zip(values, counts)})
+
+    # 打ち切らずに、最も長い transient + 周期まで全ての soup を計算した場合
+    generations = int((transient + period).max())
+    start = time.perf_counter()
+    run_soups("B3/S23", soups, generations)
+    print("run_soups ({} generations): {:.1f} s".format(generations, time.perf_counter() - start))
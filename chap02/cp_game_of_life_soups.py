@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+ランダムな初期状態 (soup) の集団によるライフゲーム型ルールの統計
+
+独立な多数の soup を (B, HEIGHT, WIDTH) の配列に重ね、
+cp_game_of_life_engine.step で全てを1回の呼び出しでまとめて計算する。
+ルールは "B3/S23" のような B/S 記法や Generations 型の文字列で与える (parse_rule 参照)。
+"""
+
+import numpy as np
+from cp_game_of_life_engine import allocate_buffers, make_rule_table, step
+
+# 実験の各パラメタ
+N_SOUPS = 1000
+WIDTH = 64
+HEIGHT = 64
+SOUP_SIZE = 16  # 中央のランダムな領域の一辺
+DENSITY = 0.5
+GENERATIONS = 500
+RULES = ["B3/S23", "B36/S23", "B3/S12345", "B2/S/C3", "345/2/4"]
+
+
+def random_soups(n_soups, height=HEIGHT, width=WIDTH, soup_size=SOUP_SIZE, density=DENSITY, seed=None):
+    """
+    中央の soup_size x soup_size の領域だけに、密度 density でランダムに生きたセルを置いた
+    soup を n_soups 個作る関数。
+
+    戻り値:
+    (n_soups, height, width) の np.int8 の配列。
+    """
+    rng = np.random.default_rng(seed)
+    soups = np.zeros((n_soups, height, width), dtype=np.int8)
+    y, x = (height - soup_size) // 2, (width - soup_size) // 2
+    soups[:, y:y+soup_size, x:x+soup_size] = rng.random((n_soups, soup_size, soup_size)) < density
+    return soups
+
+
+def run_soups(rule, soups, generations=GENERATIONS):
+    """
+    soups を rule で generations 世代計算する関数。
+
+    戻り値:
+    (最後の状態 (B, HEIGHT, WIDTH), 各世代の生きたセルの数 (generations+1, B))
+    """
+    table = make_rule_table(rule)
+    state = soups.copy()
+    next_state = np.empty_like(state)
+    buffers = allocate_buffers(state.shape)
+    populations = np.empty((generations + 1, len(state)), dtype=np.int64)
+    for t in range(generations + 1):
+        populations[t] = np.count_nonzero((state == 1).reshape(len(state), -1), axis=1)
+        if t < generations:
+            step(state, next_state, table, buffers)
+            state, next_state = next_state, state
+    return state, populations
+
+
+def soup_statistics(populations):
+    """
+    生きたセルの数の履歴から、soup の集団についての統計を計算する関数。
+
+    戻り値:
+    dict。final_mean/final_std: 最後の世代の生きたセルの数の平均と標準偏差、
+    extinct: 全滅した soup の割合、max_mean: 各 soup の最大値の平均、
+    growth: 最後の世代で最初の世代の2倍以上に増えた soup の割合。
+    """
+    final = populations[-1]
+    return {
+        "final_mean": float(final.mean()),
+        "final_std": float(final.std()),
+        "extinct": float((final == 0).mean()),
+        "max_mean": float(populations.max(axis=0).mean()),
+        "growth": float((final >= 2 * populations[0]).mean()),
+    }
+
+
+if __name__ == '__main__':
+    import time
+    soups = random_soups(N_SOUPS, seed=0)
+    for rule in RULES:
+        start = time.perf_counter()
+        _, populations = run_soups(rule, soups)
+        elapsed = time.perf_counter() - start
+        stats = soup_statistics(populations)
+        print("{:>10s} ({:.1f} s): ".format(rule, elapsed) +
+              ", ".join("{}={:.3f}".format(key, value) for key, value in stats.items()))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+活動しているタイルだけを計算する、疎な空間向けのライフゲーム
+
+空間を TILE_SIZE x TILE_SIZE のタイルに分け、生きたセルを含むタイルだけを辞書に保持する。
+直前の世代で変化したタイル (活動中のタイル) とその周りの8タイルだけを計算し直すので、
+グライダーやグライダーガンのように大部分が空か静止している場合は、
+計算量は空間の面積ではなく活動の量に比例する。
+WIDTH/HEIGHT で折り返す代わりに、必要に応じてタイルを追加して空間を広げる (無限に広い平面)。
+計算するタイルは (タイル数, TILE_SIZE+2, TILE_SIZE+2) の配列にまとめ、
+cp_game_of_life_engine.step_from_padded で一度に計算する。
+"""
+
+import numpy as np
+from cp_game_of_life_engine import LIFE_TABLE, allocate_buffers, step_from_padded
+
+TILE_SIZE = 32
+
+_NEIGHBORS = [(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)]
+
+
+class TiledLife(object):
+    """
+    タイルに分けた無限に広い平面のライフゲーム。
+    世界の座標は、最初に与えた配列の左上を (0, 0) とする。
+    """
+    def __init__(self, state=None, tile_size=TILE_SIZE, table=LIFE_TABLE):
+        self.tile_size = tile_size
+        self.table = table
+        self.tiles = {}  # (タイルの行, タイルの列) -> (tile_size, tile_size) の np.int8 の配列
+        self.active = set()  # 直前の世代で変化したタイル
+        self.generation = 0
+        self._buffers = None
+        self._zero = np.zeros((tile_size, tile_size), dtype=np.int8)
+        if state is not None:
+            self.set_array(state)
+
+    def set_array(self, state, top=0, left=0):
+        """state を世界座標の (top, left) に書き込む。書き込んだタイルは活動中にする。"""
+        T = self.tile_size
+        for y in range(top // T * T, top + state.shape[0], T):
+            for x in range(left // T * T, left + state.shape[1], T):
+                key = (y // T, x // T)
+                tile = self.tiles.get(key)
+                if tile is None:
+                    tile = np.zeros((T, T), dtype=np.int8)
+                y0, x0 = max(y, top), max(x, left)
+                y1, x1 = min(y + T, top + state.shape[0]), min(x + T, left + state.shape[1])
+                tile[y0-y:y1-y, x0-x:x1-x] = state[y0-top:y1-top, x0-left:x1-left]
+                if tile.any():
+                    self.tiles[key] = tile
+                    self.active.add(key)
+                else:
+                    self.tiles.pop(key, None)
+
+    def _get_buffers(self, n):
+        # 計算するタイルの数が増えたときだけ作業配列を確保し直す
+        if self._buffers is None or len(self._buffers[0]) < n:
+            capacity = max(n, 2 * len(self._buffers[0]) if self._buffers else 16)
+            self._buffers = allocate_buffers((capacity, self.tile_size, self.tile_size))
+            self._next = np.empty((capacity, self.tile_size, self.tile_size), dtype=np.int8)
+        return tuple(buffer[:n] for buffer in self._buffers), self._next[:n]
+
+    def _fill_padded(self, padded, key):
+        """タイル key とその周りの8タイルの端から、のりしろ付きの配列を作る"""
+        ty, tx = key
+        get = self.tiles.get
+        zero = self._zero
+        padded[1:-1, 1:-1] = get(key, zero)
+        padded[0, 1:-1] = get((ty-1, tx), zero)[-1, :]
+        padded[-1, 1:-1] = get((ty+1, tx), zero)[0, :]
+        padded[1:-1, 0] = get((ty, tx-1), zero)[:, -1]
+        padded[1:-1, -1] = get((ty, tx+1), zero)[:, 0]
+        padded[0, 0] = get((ty-1, tx-1), zero)[-1, -1]
+        padded[0, -1] = get((ty-1, tx+1), zero)[-1, 0]
+        padded[-1, 0] = get((ty+1, tx-1), zero)[0, -1]
+        padded[-1, -1] = get((ty+1, tx+1), zero)[0, 0]
+
+    def step(self, generations=1):
+        """generations 世代進める"""
+        for _ in range(generations):
+            # 活動中のタイルとその周りのタイルだけが変化しうる
+            candidates = list({(ty + dy, tx + dx) for ty, tx in self.active for dy, dx in _NEIGHBORS})
+            if not candidates:
+                self.generation += 1
+                continue
+            buffers, next_tiles = self._get_buffers(len(candidates))
+            padded = buffers[0]
+            for i, key in enumerate(candidates):
+                self._fill_padded(padded[i], key)
+            step_from_padded(padded, next_tiles, self.table, buffers)
+            changed = np.any(next_tiles != padded[:, 1:-1, 1:-1], axis=(1, 2))
+            alive = next_tiles.any(axis=(1, 2))
+
+            self.active = set()
+            for i in np.flatnonzero(changed):
+                key = candidates[i]
+                self.active.add(key)
+                if alive[i]:
+                    self.tiles[key] = next_tiles[i].copy()
+                else:
+                    del self.tiles[key]  # 空になったタイルは捨てる
+            self.generation += 1
+
+    @property
+    def population(self):
+        return int(sum(tile.sum() for tile in self.tiles.values()))
+
+    def bounding_box(self):
+        """生きたセルを含むタイルを囲む範囲 (top, left, height, width)。空なら None。"""
+        if not self.tiles:
+            return None
+        T = self.tile_size
+        ys = [ty for ty, _ in self.tiles]
+        xs = [tx for _, tx in self.tiles]
+        return min(ys) * T, min(xs) * T, (max(ys) - min(ys) + 1) * T, (max(xs) - min(xs) + 1) * T
+
+    def to_array(self, top, left, height, width):
+        """世界座標の (top, left) から height x width の範囲を np.int8 の配列として返す"""
+        T = self.tile_size
+        out = np.zeros((height, width), dtype=np.int8)
+        for (ty, tx), tile in self.tiles.items():
+            y, x = ty * T, tx * T
+            y0, x0 = max(y, top), max(x, left)
+            y1, x1 = min(y + T, top + height), min(x + T, left + width)
+            if y0 < y1 and x0 < x1:
+                out[y0-top:y1-top, x0-left:x1-left] = tile[y0-y:y1-y, x0-x:x1-x]
+        return out
+
+
+if __name__ == '__main__':
+    import sys, os
+    sys.path.append(os.pardir)
+    import time
+    from alifebook_lib.visualizers import MatrixVisualizer
+    from cp_game_of_life import GLIDER_GUN
+
+    WINDOW_HEIGHT, WINDOW_WIDTH = 256, 256
+    visualizer = MatrixVisualizer()
+    life = TiledLife(GLIDER_GUN)
+    while visualizer:
+        life.step()
+        visualizer.update(1-life.to_array(-16, -16, WINDOW_HEIGHT, WINDOW_WIDTH))
+        time.sleep(0.01)
@@ -5,23 +5,37 @@ import sys, os
 sys.path.append(os.pardir)  # 親ディレクトリのファイルをインポートするための設定
 import numpy as np
 import time
+import threading
 import matplotlib.pyplot as plt
 from alifebook_lib.visualizers import MatrixVisualizer  # 追加
+from cp_gray_scott_engine import allocate_buffers, allocate_field, bytes_per_step, interior, step
+from cp_gray_scott_adaptive import AdaptiveGrayScott
+from cp_gray_scott_checkpoint import CHECKPOINT_INTERVAL, Checkpointer, check_compatible, load_checkpoint, restore_rng
+from cp_frame_pipeline import FramePipeline, run_pipeline
 
 # シミュレーションの各パラメタ
 SPACE_GRID_SIZE = 256
 dx = 0.01
 VISUALIZATION_STEP = 8  # 何ステップごとに画面を更新するか。
+# u, v と作業配列の精度。np.float32 にするとメモリの読み書きが半分になる
+# (float64 との差は cp_gray_scott_precision.validate_precision で確かめられる)
+PRECISION = np.float64
 
 # モデルの各パラメタ
 Du = 2e-5
 Dv = 1e-5
 f, k = 0.04, 0.06  # amorphous
 
-def run_simulation(dt, max_time=10, show_pattern=True):
-    # 初期化
-    u = np.ones((SPACE_GRID_SIZE, SPACE_GRID_SIZE))
-    v = np.zeros((SPACE_GRID_SIZE, SPACE_GRID_SIZE))
+def run_simulation(dt, max_time=10, show_pattern=True, boundary="periodic", adaptive=False, dtype=PRECISION,
+                   checkpoint=None):
+    # adaptive=True のときは、dt を初期値として誤差に応じて dt を変える (cp_gray_scott_adaptive.py)
+    # checkpoint にファイルのパスを与えると、定期的に状態を保存し、次に実行したときはそこから再開する
+    # (cp_gray_scott_checkpoint.py)
+    # 初期化 (u, v はのりしろ付きの配列の内部のビュー。cp_gray_scott_engine.py 参照)
+    u_pad = allocate_field((SPACE_GRID_SIZE, SPACE_GRID_SIZE), 1.0, dtype)
+    v_pad = allocate_field((SPACE_GRID_SIZE, SPACE_GRID_SIZE), 0.0, dtype)
+    u = interior(u_pad)
+    v = interior(v_pad)
     SQUARE_SIZE = 20
     u[SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2,
       SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2] = 0.5
@@ -29,46 +43,104 @@ def run_simulation(dt, max_time=10, show_pattern=True):
       SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2] = 0.25
     u += np.random.rand(SPACE_GRID_SIZE, SPACE_GRID_SIZE)*0.1
     v += np.random.rand(SPACE_GRID_SIZE, SPACE_GRID_SIZE)*0.1
+    buffers = allocate_buffers(u.shape, dtype)  # 作業配列はループの外で一度だけ確保する
+
+    simulated_time = 0
+    n_steps = 0
+    checkpointer = None
+    if checkpoint is not None:
+        parameters = {"f": f, "k": k, "Du": Du, "Dv": Dv, "dx": dx, "boundary": boundary, "adaptive": adaptive}
+        if not adaptive:
+            parameters["dt"] = dt  # dt を変えない計算では、dt が違えば別の計算になる
+        saved = load_checkpoint(checkpoint)
+        if saved is not None:  # 保存した状態から再開する (設定が違うチェックポイントなら ValueError)
+            check_compatible(saved[2], u.shape, dtype, parameters)
+            u[...], v[...] = saved[0], saved[1]
+            simulated_time, n_steps = saved[2]["time"], saved[2]["steps"]
+            restore_rng(saved[2]["rng"])
+            if adaptive:
+                dt = saved[2]["extra"].get("dt", dt)  # dt を変える計算では、dt も計算の状態の一部
+            print("t={} から再開します。".format(simulated_time))
+        checkpointer = Checkpointer(checkpoint, u.shape, dtype, parameters=parameters)
+    solver = AdaptiveGrayScott(u_pad, v_pad, f, k, dt, Du=Du, Dv=Dv, dx=dx, boundary=boundary) if adaptive else None
+    start_time = simulated_time
 
     times = []
-    total_time = 0
     visualizer = MatrixVisualizer() if show_pattern else None  # 追加
 
-    while total_time < max_time and (visualizer is None or visualizer):
-        start = time.time()
-        for i in range(VISUALIZATION_STEP):
-            # ラプラシアンの計算
-            laplacian_u = (np.roll(u, 1, axis=0) + np.roll(u, -1, axis=0) +
-                           np.roll(u, 1, axis=1) + np.roll(u, -1, axis=1) - 4*u) / (dx*dx)
-            laplacian_v = (np.roll(v, 1, axis=0) + np.roll(v, -1, axis=0) +
-                           np.roll(v, 1, axis=1) + np.roll(v, -1, axis=1) - 4*v) / (dx*dx)
-            # Gray-Scottモデル方程式
-            dudt = Du*laplacian_u - u*v*v + f*(1.0-u)
-            dvdt = Dv*laplacian_v + u*v*v - (f+k)*v
-            u += dt * dudt
-            v += dt * dvdt
-        end = time.time()
-        times.append(end - start)
-        total_time += (end - start)
-        if visualizer is not None:
-            visualizer.update(u)  # 追加: パターンの進化を可視化
+    def solve(pipeline, stop):
+        # 計算は別のスレッドで行い、VISUALIZATION_STEP ステップごとに u を pipeline に渡すだけで描画は待たない
+        # (描画が追いつかないフレームは捨てられる。cp_frame_pipeline.py 参照)。times は計算の時間だけになる
+        nonlocal simulated_time, n_steps
+        total_time = 0
+        while total_time < max_time and not stop.is_set():
+            start = time.time()
+            for i in range(VISUALIZATION_STEP):
+                if solver is not None:
+                    simulated_time += solver.step()
+                else:
+                    # ラプラシアンとGray-Scottモデル方程式の計算 (作業配列の上で in-place に行う)
+                    step(u_pad, v_pad, f, k, dt, buffers, Du, Dv, dx, boundary)
+                    simulated_time += dt
+                n_steps += 1
+            end = time.time()
+            times.append(end - start)
+            total_time += (end - start)
+            if pipeline is not None:
+                pipeline.publish(u)  # 追加: パターンの進化を可視化 (u のコピーを渡すので、描画で u は変わらない)
+            if checkpointer is not None and len(times) % CHECKPOINT_INTERVAL == 0:
+                # u, v をコピーするだけで、ファイルへの書き込みは別のスレッドで行う
+                checkpointer.save(u, v, simulated_time, n_steps, extra={"dt": solver.dt if solver else dt})
+        return total_time
+
+    if visualizer is not None:
+        pipeline = FramePipeline(u.shape, dtype)
+        total_time = run_pipeline(solve, pipeline, lambda frame, info: visualizer.update(frame),
+                                  alive=lambda: bool(visualizer))
+        print("frames: {} shown, {} dropped".format(pipeline.delivered, pipeline.dropped))
+    else:
+        total_time = solve(None, threading.Event())
+    if checkpointer is not None:
+        checkpointer.save(u, v, simulated_time, n_steps, extra={"dt": solver.dt if solver else dt})
+        checkpointer.close()
+    # 計算時間1秒あたりに進んだシミュレーション上の時間
+    # (1度もステップを計算しなかったときは 0 で割らないように nan にする)
+    rate = (simulated_time - start_time) / total_time if total_time > 0 else float("nan")
+    print("simulated time / wall second: {:.1f}".format(rate))
     return times
 
-# dt=1, dt=0.1の2パターンでそれぞれ実行
-print("dt=1でシミュレーションを開始します。")
-times_dt1 = run_simulation(dt=1, max_time=10, show_pattern=True)
-input("10秒経過しました。続けるにはEnterを押してください。")
-print("dt=0.1でシミュレーションを開始します。")
-times_dt01 = run_simulation(dt=0.1, max_time=10, show_pattern=True)
-input("10秒経過しました。続けるにはEnterを押してください。")
+if __name__ == '__main__':
+    # dt=1, dt=0.1の2パターンでそれぞれ実行
+    print("dt=1でシミュレーションを開始します。")
+    times_dt1 = run_simulation(dt=1, max_time=10, show_pattern=True)
+    input("10秒経過しました。続けるにはEnterを押してください。")
+    print("dt=0.1でシミュレーションを開始します。")
+    times_dt01 = run_simulation(dt=0.1, max_time=10, show_pattern=True)
+    input("10秒経過しました。続けるにはEnterを押してください。")
+    print("dtを自動で変えるシミュレーションを開始します。")
+    times_adaptive = run_simulation(dt=0.1, max_time=10, show_pattern=True, adaptive=True)
+    input("10秒経過しました。続けるにはEnterを押してください。")
 
-# 計算量の可視化
-plt.plot(times_dt1, label='dt=1')
-plt.plot(times_dt01, label='dt=0.1')
-plt.xlabel('Step')
-plt.ylabel('Computation Time (s)')
-plt.title('Computation Time per Step (10 seconds)')
-plt.legend()
-plt.grid(True)
-plt.show()
+    # 1ステップあたりのメモリの読み書きの量 (バイト) と、実際に出ていた速度 (GB/s)
+    traffic = bytes_per_step((SPACE_GRID_SIZE, SPACE_GRID_SIZE), PRECISION)
+    print("memory traffic: {:.1f} MB/step".format(traffic / 1e6))
 
+    # 計算量の可視化
+    fig, axes = plt.subplots(1, 2, figsize=(12, 4))
+    axes[0].plot(times_dt1, label='dt=1')
+    axes[0].plot(times_dt01, label='dt=0.1')
+    axes[0].plot(times_adaptive, label='adaptive')
+    axes[0].set_xlabel('Step')
+    axes[0].set_ylabel('Computation Time (s)')
+    axes[0].set_title('Computation Time per Step (10 seconds)')
+    axes[0].legend()
+    axes[0].grid(True)
+    axes[1].plot(traffic * VISUALIZATION_STEP / np.array(times_dt1) / 1e9, label='dt=1')
+    axes[1].plot(traffic * VISUALIZATION_STEP / np.array(times_dt01) / 1e9, label='dt=0.1')
+    axes[1].set_xlabel('Step')
+    axes[1].set_ylabel('Memory Traffic (GB/s)')
+    axes[1].set_title('Memory Traffic ({:.1f} MB per time step)'.format(traffic / 1e6))
+    axes[1].legend()
+    axes[1].grid(True)
+    plt.tight_layout()
+    plt.show()
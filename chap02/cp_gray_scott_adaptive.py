@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+誤差を制御しながら時間刻み dt を自動で変える Gray-Scott モデルの計算
+
+埋め込み型のルンゲ=クッタ法 (Bogacki-Shampine の 3(2) 次の組) で、
+3次の解と2次の解の差から1ステップの誤差を見積もる。
+誤差が許容値 (rtol, atol) より小さければステップを採用して dt を大きくし、
+大きければ状態を変えずに dt を小さくしてやり直す。
+パターンがゆっくり変わるときは dt が大きくなり、前線ができるときは小さくなる。
+
+最後の段の時間微分は次のステップの最初の段にそのまま使える (FSAL) ので、
+採用・棄却のどちらでも1ステップあたりの時間微分の計算は3回で済み、
+棄却したときも作業配列を入れ替えるだけで、状態のコピーは要らない。
+時間微分の計算には cp_gray_scott_engine.time_derivative を使う。
+"""
+
+import numpy as np
+from cp_gray_scott_engine import allocate_field, time_derivative
+
+# 誤差の許容値と、dt を変える割合の上限・下限
+RTOL = 1e-3
+ATOL = 1e-6
+SAFETY = 0.9
+MAX_FACTOR = 2.0
+MIN_FACTOR = 0.2
+
+
+class AdaptiveGrayScott(object):
+    """
+    のりしろ付きの場 u_pad, v_pad (cp_gray_scott_engine.allocate_field) を、
+    dt を自動で変えながらその場で更新するクラス。
+    """
+    def __init__(self, u_pad, v_pad, f, k, dt=1.0, rtol=RTOL, atol=ATOL, max_dt=None,
+                 Du=2e-5, Dv=1e-5, dx=0.01, boundary="periodic", boundary_values=(1.0, 0.0)):
+        self.u_pad, self.v_pad = u_pad, v_pad
+        self.f, self.k = f, k
+        self.dt = dt
+        self.rtol, self.atol = rtol, atol
+        self.max_dt = max_dt
+        self.options = (Du, Dv, dx, boundary, boundary_values)
+        self.time = 0.0
+        self.accepted = 0
+        self.rejected = 0
+        shape = u_pad[..., 1:-1, 1:-1].shape
+        # 途中の段の状態 (のりしろ付き)、各段の時間微分 k1-k4 (それぞれ u, v)、作業配列
+        self.stage = (allocate_field(shape, dtype=u_pad.dtype), allocate_field(shape, dtype=v_pad.dtype))
+        self.slopes = [tuple(np.empty(shape, dtype=u_pad.dtype) for _ in range(2)) for _ in range(4)]
+        self.work = tuple(np.empty(shape, dtype=u_pad.dtype) for _ in range(3))
+        self.state_changed()
+
+    def state_changed(self):
+        """u, v を外から書き換えたとき (MatrixVisualizer.update による値の切り詰めなど) に呼ぶ"""
+        self._derivative(self.u_pad, self.v_pad, self.slopes[0])
+
+    def _derivative(self, u_pad, v_pad, out):
+        time_derivative(u_pad, v_pad, self.f, self.k, out[0], out[1], self.work[:2], *self.options)
+
+    def _stage(self, coefficients, dt):
+        """stage = y + dt * Σ c_i k_i (内部だけ)"""
+        for field, (state, stage) in enumerate(zip((self.u_pad, self.v_pad), self.stage)):
+            target = stage[..., 1:-1, 1:-1]
+            np.copyto(target, state[..., 1:-1, 1:-1])
+            for c, k in zip(coefficients, self.slopes):
+                if c != 0:
+                    np.multiply(k[field], c * dt, out=self.work[2])
+                    target += self.work[2]
+
+    def _error(self, dt):
+        """誤差の見積もり dt (-5/72 k1 + 1/12 k2 + 1/9 k3 - 1/8 k4) を許容値で割った RMS"""
+        error, scale = self.work[1], self.work[2]
+        norm = 0.0
+        for field, stage in enumerate(self.stage):
+            np.multiply(self.slopes[0][field], -5.0 / 72, out=error)
+            for c, k in zip((1.0 / 12, 1.0 / 9, -1.0 / 8), self.slopes[1:]):
+                np.multiply(k[field], c, out=scale)
+                error += scale
+            error *= dt
+            np.abs(stage[..., 1:-1, 1:-1], out=scale)
+            scale *= self.rtol
+            scale += self.atol
+            error /= scale
+            norm = max(norm, np.sqrt(np.mean(np.square(error, out=error))))
+        return norm
+
+    def step(self, max_dt=None):
+        """
+        1ステップ進める (誤差が許容値を超えたら dt を小さくしてやり直す)。
+        max_dt を与えると、dt をそれ以下にする (ちょうどある時刻で止めたいときなど)。
+
+        戻り値:
+        実際に進めた時間。
+        """
+        while True:
+            dt = self.dt if max_dt is None else min(self.dt, max_dt)
+            self._stage((0.5,), dt)
+            self._derivative(*self.stage, out=self.slopes[1])
+            self._stage((0.0, 0.75), dt)
+            self._derivative(*self.stage, out=self.slopes[2])
+            self._stage((2.0 / 9, 1.0 / 3, 4.0 / 9), dt)  # 3次の解
+            self._derivative(*self.stage, out=self.slopes[3])
+            error = self._error(dt)
+            # 誤差が0に近いときは MAX_FACTOR 倍、nan (発散) のときは MIN_FACTOR 倍にする
+            factor = SAFETY * error ** (-1.0 / 3) if error > 0 else MAX_FACTOR
+            factor = min(MAX_FACTOR, max(MIN_FACTOR, factor)) if np.isfinite(error) else MIN_FACTOR
+            if error <= 1.0:
+                for state, stage in zip((self.u_pad, self.v_pad), self.stage):
+                    np.copyto(state[..., 1:-1, 1:-1], stage[..., 1:-1, 1:-1])
+                self.slopes[0], self.slopes[3] = self.slopes[3], self.slopes[0]  # FSAL
+                self.time += dt
+                self.accepted += 1
+                if max_dt is None or dt == self.dt:
+                    self.dt = dt * factor if self.max_dt is None else min(self.max_dt, dt * factor)
+                return dt
+            self.rejected += 1
+            self.dt = dt * factor
+
+    def advance(self, duration):
+        """時間 duration だけ進める (最後のステップは dt を切り詰めて、ちょうどその時刻で止める)"""
+        t_end = self.time + duration
+        while t_end - self.time > 1e-12 * max(1.0, abs(t_end)):
+            self.step(t_end - self.time)
+        return self
+
+
+if __name__ == '__main__':
+    import time
+    from cp_gray_scott_engine import allocate_buffers, interior, step
+    from cp_gray_scott_spectral import initialize_state
+
+    T_END = 3000
+    f, k = 0.04, 0.06
+    u0, v0 = initialize_state(seed=0)
+
+    def fields():
+        u_pad = allocate_field(u0.shape, 1.0)
+        v_pad = allocate_field(v0.shape, 0.0)
+        interior(u_pad)[...] = u0
+        interior(v_pad)[...] = v0
+        return u_pad, v_pad
+
+    # 基準: dt を固定した前進オイラー法 (cp_gray_scott.py と同じ)
+    results = {}
+    for dt in (1.0, 0.1):
+        u_pad, v_pad = fields()
+        buffers = allocate_buffers(u0.shape)
+        start = time.perf_counter()
+        for _ in range(int(round(T_END / dt))):
+            step(u_pad, v_pad, f, k, dt, buffers)
+        elapsed = time.perf_counter() - start
+        results[dt] = interior(u_pad).copy()
+        print("euler    dt={:<4}: simulated time / wall second = {:7.1f}".format(dt, T_END / elapsed))
+
+    for rtol in (1e-2, 1e-3, 1e-4):
+        u_pad, v_pad = fields()
+        solver = AdaptiveGrayScott(u_pad, v_pad, f, k, dt=0.1, rtol=rtol)
+        history = []
+        start = time.perf_counter()
+        while solver.time < T_END:
+            history.append(solver.step(T_END - solver.time))
+        elapsed = time.perf_counter() - start
+        difference = np.sqrt(np.mean((interior(u_pad) - results[0.1])**2))
+        print("adaptive rtol={:.0e}: simulated time / wall second = {:7.1f}, "
+              "accepted {}, rejected {}, dt {:.3f}-{:.3f}, RMS difference from dt=0.1 {:.1e}".format(
+                  rtol, T_END / elapsed, solver.accepted, solver.rejected,
+                  min(history[:-1]), max(history), difference))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gray-Scott モデルのパターンの地図 (atlas)
+
+(f, k) の格子の各点について、独立な小さな空間 (cp_gray_scott_ensemble.py と同じく (B, N, N) にまとめる) を
+定常状態になるまで計算し、パターンを次の4種類に分類する。
+  - homogeneous: 定常で、u がほぼ一様
+  - spots: 定常で、孤立した斑点 (または一様な背景に開いた穴) が並ぶ
+  - stripes: 定常で、縞や迷路のようにつながった模様
+  - waves: MAX_STEPS ステップ計算しても定常にならない (動き続ける波や、分裂を繰り返す斑点)
+定常かどうかは、CHECK_INTERVAL ステップごとに時間微分の最大値 max(|du/dt|, |dv/dt|) で判定する
+(前進オイラー法の更新量 dt * du/dt が作業配列に残っているので、追加の計算はほとんど要らない)。
+定常になった空間はバッチから取り除くので、早く落ち着く点ほど計算が早く終わる。
+
+結果は (f, k, Du, Dv, dx, dt, 空間の大きさ, シード, MAX_STEPS, STATIONARY_TOLERANCE, CHECK_INTERVAL) ごとにディスクにキャッシュするので、
+格子を細かくしたり範囲を広げたりしても、計算済みの点は計算し直さない。
+"""
+
+import numpy as np
+from cp_gray_scott_engine import allocate_buffers, interior, step
+from cp_gray_scott_ensemble import initialize_ensemble, parameter_grid
+from cp_gray_scott_precision import HOMOGENEOUS_STD, pattern_statistics
+from cp_result_cache import ResultCache
+
+# 地図の各パラメタ
+SPACE_GRID_SIZE = 64
+MAX_STEPS = 50000
+CHECK_INTERVAL = 100           # 何ステップごとに定常かどうかを調べるか
+STATIONARY_TOLERANCE = 5e-5    # max(|du/dt|, |dv/dt|) がこれより小さければ定常
+SPOT_EULER = 0.3               # 1波長四方あたりのオイラー数の絶対値がこれより大きければ spots
+KEY_DIGITS = 6                 # キャッシュのキーにする f, k の桁数 (格子を作り直しても同じ点が同じキーになるように)
+BATCH_SIZE = 256
+CACHE_DIR = "gray_scott_atlas_cache"
+CLASSES = ("homogeneous", "spots", "stripes", "waves")
+
+# モデルの各パラメタ (cp_gray_scott.py と同じ)
+dx = 0.01
+dt = 1.0
+Du = 2e-5
+Dv = 1e-5
+
+
+def euler_number(mask):
+    """
+    2値の画像 mask (..., HEIGHT, WIDTH) のオイラー数 (8近傍でつながった成分の数 - 穴の数) を求める関数 (周期境界条件)。
+    2x2 のブロックの並び方を数えるだけ (Gray の bit-quad) なので、ラベル付けが要らず、バッチのまま計算できる。
+    """
+    mask = np.asarray(mask, dtype=np.int8)
+    right = np.roll(mask, -1, axis=-1)
+    quad = mask + right + np.roll(mask, -1, axis=-2) + np.roll(right, -1, axis=-2)
+    q1 = np.count_nonzero(quad == 1, axis=(-2, -1))
+    q3 = np.count_nonzero(quad == 3, axis=(-2, -1))
+    # 対角の2つだけが1のブロック
+    diagonal = (quad == 2) & (mask == np.roll(right, -1, axis=-2))
+    qd = np.count_nonzero(diagonal, axis=(-2, -1))
+    return (q1 - q3 - 2 * qd) // 4
+
+
+def classify(statistics, stationary):
+    """
+    pattern_statistics の結果 (と euler) と、定常かどうか stationary から、パターンの種類 (CLASSES の名前) を決める関数。
+    バッチならまとめて判定し、名前の配列を返す。
+    """
+    wavelength = np.maximum(statistics["wavelength"], 1.0)
+    size = statistics["size"]
+    # 1波長四方あたりのオイラー数: 斑点なら斑点1つにつき約 +1 (穴なら -1)、縞や迷路ならほぼ 0
+    euler = statistics["euler"] * wavelength**2 / size**2
+    return np.select([~stationary, statistics["std"] <= HOMOGENEOUS_STD, np.abs(euler) > SPOT_EULER],
+                     ["waves", "homogeneous", "spots"], "stripes")
+
+
+def run_until_stationary(f, k, size=SPACE_GRID_SIZE, max_steps=MAX_STEPS, dt=dt, tolerance=STATIONARY_TOLERANCE,
+                         check_interval=CHECK_INTERVAL, seed=0, Du=Du, Dv=Dv, dx=dx):
+    """
+    パラメタ f[i], k[i] の独立な空間を、定常になるか max_steps ステップに達するまでまとめて計算する関数。
+    全ての空間は seed から決まる同じ初期状態から始める (結果がバッチの分け方によらないように)。
+
+    戻り値:
+    (u (B, size, size), v (B, size, size), 計算したステップ数 (B,), 最後に調べた時間微分の最大値 (B,))。
+    """
+    f = np.asarray(f, dtype=np.float64)
+    k = np.asarray(k, dtype=np.float64)
+    n = len(f)
+    u0_pad, v0_pad = initialize_ensemble(1, size, seed=seed)
+    u_pad = np.repeat(u0_pad, n, axis=0)
+    v_pad = np.repeat(v0_pad, n, axis=0)
+    buffers = allocate_buffers((n, size, size))
+    u_all = np.empty((n, size, size))
+    v_all = np.empty((n, size, size))
+    steps = np.full(n, max_steps)
+    residual = np.full(n, np.inf)
+    index = np.arange(n)  # バッチの各空間が元の何番目か
+    f_batch, k_batch = f[:, np.newaxis, np.newaxis], k[:, np.newaxis, np.newaxis]
+
+    n_steps = 0
+    while len(index) > 0:
+        m = len(index)
+        # 先頭の軸で切り出したビューは連続なので、作業配列は最初に確保したものの先頭 m 個をそのまま使う
+        work = [buffer[:m] for buffer in buffers]
+        for _ in range(min(check_interval, max_steps - n_steps)):
+            step(u_pad, v_pad, f_batch, k_batch, dt, work, Du, Dv, dx)
+        n_steps += min(check_interval, max_steps - n_steps)
+        # 最後のステップの dt * du/dt, dt * dv/dt が work[0], work[1] に残っている
+        np.abs(work[0], out=work[2])
+        np.abs(work[1], out=work[3])
+        residual[index] = np.maximum(work[2].max(axis=(-2, -1)), work[3].max(axis=(-2, -1))) / dt
+        done = (residual[index] < tolerance) | (n_steps >= max_steps)
+        if np.any(done):
+            u_all[index[done]] = interior(u_pad[done])
+            v_all[index[done]] = interior(v_pad[done])
+            steps[index[done]] = n_steps
+            keep = ~done
+            index = index[keep]
+            u_pad, v_pad = u_pad[keep], v_pad[keep]
+            f_batch, k_batch = f_batch[keep], k_batch[keep]
+    return u_all, v_all, steps, residual
+
+
+def atlas(f, k, size=SPACE_GRID_SIZE, max_steps=MAX_STEPS, dt=dt, tolerance=STATIONARY_TOLERANCE,
+          check_interval=CHECK_INTERVAL, seed=0, Du=Du, Dv=Dv, dx=dx, batch_size=BATCH_SIZE, cache_dir=CACHE_DIR):
+    """
+    (f[i], k[i]) の各点のパターンを分類する関数。キャッシュに無い点だけを batch_size 個ずつまとめて計算する。
+
+    戻り値:
+    点ごとの結果の dict のリスト。class: パターンの種類、stationary: 定常になったか、steps: 計算したステップ数、
+    residual: 最後の時間微分の最大値、std, active, wavelength: pattern_statistics の値、euler: v の模様のオイラー数。
+    """
+    cache = ResultCache(cache_dir)
+    f = np.round(np.asarray(f, dtype=np.float64), KEY_DIGITS)
+    k = np.round(np.asarray(k, dtype=np.float64), KEY_DIGITS)
+    # check_interval も定常の判定とステップ数を変えるので、キーに含める
+    keys = [(float(fi), float(ki), Du, Dv, dx, dt, size, seed, max_steps, tolerance, check_interval)
+            for fi, ki in zip(f, k)]
+    results = [cache.get(key) for key in keys]
+    missing = np.array([i for i, result in enumerate(results) if result is None], dtype=int)
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start+batch_size]
+        u, v, steps, residual = run_until_stationary(f[batch], k[batch], size, max_steps, dt, tolerance,
+                                                     check_interval, seed, Du, Dv, dx)
+        statistics = pattern_statistics(u, v)
+        # v の模様 (最小と最大の中間より大きい領域) のつながり方
+        low, high = v.min(axis=(-2, -1), keepdims=True), v.max(axis=(-2, -1), keepdims=True)
+        statistics["euler"] = euler_number(v > (low + high) / 2)
+        statistics["size"] = size
+        stationary = residual < tolerance
+        classes = classify(statistics, stationary)
+        for j, i in enumerate(batch):
+            results[i] = {
+                "class": str(classes[j]), "stationary": bool(stationary[j]), "steps": int(steps[j]),
+                "residual": float(residual[j]), "std": float(statistics["std"][j]),
+                "active": float(statistics["active"][j]), "wavelength": float(statistics["wavelength"][j]),
+                "euler": int(statistics["euler"][j]),
+            }
+            cache.put(keys[i], results[i])
+    return results
+
+
+if __name__ == '__main__':
+    import time
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap
+
+    F_RANGE, K_RANGE = (0.01, 0.06), (0.04, 0.07)
+    for n in (9, 17):  # 粗い格子の後に細かい格子を計算する (粗い格子の点はキャッシュから読む)
+        f, k = parameter_grid(F_RANGE, K_RANGE, n, n)
+        start = time.perf_counter()
+        results = atlas(f, k)
+        print("{}x{} atlas: {:.1f} s".format(n, n, time.perf_counter() - start))
+
+    classes = np.array([CLASSES.index(result["class"]) for result in results]).reshape(n, n)
+    steps = np.array([result["steps"] for result in results]).reshape(n, n)
+    extent = (F_RANGE[0], F_RANGE[1], K_RANGE[1], K_RANGE[0])
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+    im = axes[0].imshow(classes, extent=extent, aspect='auto', interpolation='nearest',
+                        cmap=ListedColormap(['lightgray', 'tab:red', 'tab:blue', 'tab:green']), vmin=-0.5, vmax=3.5)
+    cbar = fig.colorbar(im, ax=axes[0], ticks=range(len(CLASSES)))
+    cbar.ax.set_yticklabels(CLASSES)
+    axes[0].set_title('Pattern Class')
+    im = axes[1].imshow(steps, extent=extent, aspect='auto', interpolation='nearest')
+    fig.colorbar(im, ax=axes[1])
+    axes[1].set_title('Steps until Stationary')
+    for ax in axes:
+        ax.set_xlabel('f')
+        ax.set_ylabel('k')
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+長時間の Gray-Scott モデルの計算のチェックポイントと再開
+
+u, v をメモリマップした .npy ファイル (path) に、シミュレーション上の時刻、ステップ数、
+乱数生成器の状態、パラメタを path + ".json" に保存する。
+.npy には2つの区画 (slot) があり、書き込みは必ず最新でない方の区画に行い、
+書き終えてから .json を一時ファイルからの置き換えで更新して、その区画を指すようにする。
+そのため、書き込みの途中で止まっても、1つ前のチェックポイントが壊れずに残る。
+
+ループからは u, v を作業用の配列にコピーするだけで、ファイルへの書き込みは別のスレッドで行うので、
+計算のループはディスクへの書き込みを待たない (前のチェックポイントの書き込みが終わっていない場合だけ待つ)。
+保存した状態から同じ手順で計算を続ければ、途中で止めなかった場合とビット単位で同じ結果になる。
+"""
+
+import os
+import json
+import queue
+import threading
+import numpy as np
+
+CHECKPOINT_INTERVAL = 100  # 何回ごとにチェックポイントを保存するか (cp_gray_scott.py では画面の更新の回数)
+
+
+def _meta_path(path):
+    return path + ".json"
+
+
+def rng_state(rng=None):
+    """乱数生成器の状態を JSON に保存できる形で返す (rng が None なら np.random のグローバルな状態)"""
+    if rng is not None:
+        return {"kind": "generator", "state": rng.bit_generator.state}
+    name, keys, position, has_gauss, cached = np.random.get_state()
+    return {"kind": "legacy", "state": [name, keys.tolist(), position, has_gauss, cached]}
+
+
+def restore_rng(state):
+    """
+    rng_state で保存した状態を戻す関数。
+
+    戻り値:
+    "generator" なら状態を戻した np.random.Generator、"legacy" なら np.random のグローバルな状態を戻して None。
+    """
+    if state["kind"] == "generator":
+        bit_generator = getattr(np.random, state["state"]["bit_generator"])()
+        bit_generator.state = state["state"]
+        return np.random.Generator(bit_generator)
+    name, keys, position, has_gauss, cached = state["state"]
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), position, has_gauss, cached))
+    return None
+
+
+class Checkpointer(object):
+    """u, v を path (.npy) にメモリマップして、別のスレッドで定期的に保存するクラス"""
+    def __init__(self, path, shape, dtype=np.float64, parameters=None):
+        """
+        引数:
+        path (str): チェックポイントの .npy ファイルのパス。既にあれば続きから上書きする。
+        shape (tuple): u, v の形。
+        parameters (dict): 一緒に保存するモデルのパラメタ (JSON に保存できる値)。
+        """
+        self.path = path
+        self.parameters = parameters or {}
+        shape = (2, 2) + tuple(shape)  # (区画, (u, v), HEIGHT, WIDTH)
+        meta = None
+        if os.path.exists(path) and os.path.exists(_meta_path(path)):
+            meta = load_meta(path)
+        if meta is not None and tuple(meta["shape"]) == shape[2:] and meta["dtype"] == np.dtype(dtype).str:
+            self._file = np.lib.format.open_memmap(path, mode='r+')
+            self._slot = meta["slot"]
+        else:
+            self._file = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+            self._slot = 1  # 最初の書き込みは区画0に行う
+        self._staging = np.empty(shape[1:], dtype=dtype)
+        self._queue = queue.Queue(maxsize=1)
+        self._error = None  # 書き込みのスレッドで起きた例外 (次の save, wait, close で送出する)
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def save(self, u, v, time, steps, rng=None, extra=None):
+        """
+        u, v と時刻 time、ステップ数 steps、乱数生成器の状態を保存する。
+        ここでは u, v をコピーするだけで、書き込みは別のスレッドで行う。
+        extra には、再開に必要なその他の値 (dt を変える計算での現在の dt など) を dict で与える。
+        """
+        self._queue.join()  # 前のチェックポイントがまだ作業用の配列を使っていれば待つ
+        self._raise_error()
+        np.copyto(self._staging[0], u)
+        np.copyto(self._staging[1], v)
+        meta = {"time": time, "steps": steps, "rng": rng_state(rng), "extra": extra or {}}
+        self._queue.put(meta)
+
+    def _write_loop(self):
+        while True:
+            meta = self._queue.get()
+            if meta is None:
+                self._queue.task_done()
+                return
+            try:
+                self._write(meta)
+            except Exception as e:  # ディスクがいっぱいなど。スレッドは止めずに、呼び出し側で送出する
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _write(self, meta):
+        slot = 1 - self._slot
+        self._file[slot] = self._staging
+        self._file.flush()
+        meta.update({"slot": slot, "shape": list(self._file.shape[2:]), "dtype": self._file.dtype.str,
+                     "parameters": self.parameters})
+        meta_path = _meta_path(self.path)
+        tmp_path = "{}.{}.tmp".format(meta_path, os.getpid())
+        with open(tmp_path, 'w') as fp:
+            json.dump(meta, fp)
+        os.replace(tmp_path, meta_path)
+        self._slot = slot
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def wait(self):
+        """書き込み中のチェックポイントがあれば、書き終わるまで待つ (書き込みに失敗していれば、その例外を送出する)"""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self):
+        """書き込みを終えてスレッドを止める (書き込みに失敗していれば、その例外を送出する)"""
+        self._queue.join()
+        self._queue.put(None)
+        self._thread.join()
+        del self._file
+        self._raise_error()
+
+
+def load_meta(path):
+    """チェックポイントのメタデータ (時刻、ステップ数、乱数生成器の状態、パラメタなど) を読み込む関数"""
+    with open(_meta_path(path)) as fp:
+        return json.load(fp)
+
+
+def check_compatible(meta, shape, dtype, parameters):
+    """
+    チェックポイントのメタデータ meta が、これから続ける計算 (u, v の形 shape, 精度 dtype, パラメタ parameters) と
+    同じ設定のものかを調べる関数。違っていれば ValueError を送出する。
+    """
+    differences = []
+    if tuple(meta["shape"]) != tuple(shape):
+        differences.append("shape: {} != {}".format(tuple(meta["shape"]), tuple(shape)))
+    if meta["dtype"] != np.dtype(dtype).str:
+        differences.append("dtype: {} != {}".format(meta["dtype"], np.dtype(dtype).str))
+    saved = meta.get("parameters", {})
+    for name in sorted(set(saved) | set(parameters)):
+        if saved.get(name) != parameters.get(name):
+            differences.append("{}: {!r} != {!r}".format(name, saved.get(name), parameters.get(name)))
+    if differences:
+        raise ValueError("checkpoint was saved with different settings ({})".format(", ".join(differences)))
+
+
+def load_checkpoint(path):
+    """
+    最後に書き終えたチェックポイントを読み込む関数。
+
+    戻り値:
+    (u, v, メタデータの dict)。チェックポイントが無ければ None。
+    """
+    if not (os.path.exists(path) and os.path.exists(_meta_path(path))):
+        return None
+    meta = load_meta(path)
+    data = np.load(path, mmap_mode='r')
+    u, v = np.array(data[meta["slot"], 0]), np.array(data[meta["slot"], 1])
+    del data
+    return u, v, meta
+
+
+if __name__ == '__main__':
+    import tempfile
+    from cp_gray_scott_engine import allocate_buffers, allocate_field, interior, step
+    from cp_gray_scott_spectral import initialize_state
+
+    STEPS = 2000
+    f, k, dt = 0.04, 0.06, 1.0
+    rng = np.random.default_rng(0)
+
+    def run(u, v, steps, start, checkpointer=None):
+        u_pad, v_pad = allocate_field(u.shape, 1.0), allocate_field(v.shape, 0.0)
+        interior(u_pad)[...] = u
+        interior(v_pad)[...] = v
+        buffers = allocate_buffers(u.shape)
+        for n in range(start, steps):
+            step(u_pad, v_pad, f, k, dt, buffers)
+            if checkpointer is not None and (n + 1) % CHECKPOINT_INTERVAL == 0:
+                checkpointer.save(interior(u_pad), interior(v_pad), (n + 1) * dt, n + 1, rng)
+            if checkpointer is not None and n + 1 == steps // 2 + 50:
+                return None  # 途中で止まった (最後のチェックポイントは steps // 2 ステップ目)
+        return interior(u_pad).copy(), interior(v_pad).copy()
+
+    u0, v0 = initialize_state(seed=0)
+    u_full, v_full = run(u0, v0, STEPS, 0)
+
+    path = os.path.join(tempfile.mkdtemp(), "gray_scott_checkpoint.npy")
+    checkpointer = Checkpointer(path, u0.shape, parameters={"f": f, "k": k, "dt": dt})
+    run(u0, v0, STEPS, 0, checkpointer)
+    checkpointer.close()
+
+    u, v, meta = load_checkpoint(path)
+    print("resume from step {} (t = {})".format(meta["steps"], meta["time"]))
+    u_resumed, v_resumed = run(u, v, STEPS, meta["steps"])
+    print("bit-identical:", np.array_equal(u_full, u_resumed) and np.array_equal(v_full, v_resumed))
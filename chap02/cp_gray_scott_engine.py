@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gray-Scott モデルの計算エンジン
+
+cp_gray_scott.py では1ステップごとに np.roll で8個の配列を作り、
+さらに laplacian_u, dudt などの一時的な配列も毎回確保していた
+(cp_gray_scott_param.py ではさらに np.pad で2回コピーしていた)。
+ここでは u, v を1セル分の「のりしろ」(ゴーストセル) 付きの配列に置き、
+のりしろを境界条件に従って埋めてから、あらかじめ確保した作業配列の上で
+全ての計算を in-place (out= や +=) で行う。ループ内では配列を一切確保しない。
+
+境界条件は次の3つから選べる。
+  "periodic"  周期境界条件 (cp_gray_scott.py と同じ)
+  "neumann"   端のセルの値をのりしろにコピーする (勾配0、cp_gray_scott_param.py の np.pad(..., 'edge') と同じ)
+  "dirichlet" のりしろを一定の値 (u=1, v=0 の一様な定常状態など) に固定する
+f, k はスカラーでも、空間と同じ形の配列 (場所ごとに異なるパラメタ) でもよい。
+"""
+
+import numpy as np
+
+BOUNDARIES = ("periodic", "neumann", "dirichlet")
+
+
+def allocate_field(shape, value=0.0, dtype=np.float64):
+    """
+    のりしろ付きの場 (..., HEIGHT+2, WIDTH+2) を確保し、value で埋める関数。
+    計算に使う内部の領域は interior で取り出す。
+    """
+    shape = tuple(shape)
+    return np.full(shape[:-2] + (shape[-2] + 2, shape[-1] + 2), value, dtype=dtype)
+
+
+def interior(padded):
+    """のりしろ付きの場の内部 (..., HEIGHT, WIDTH) のビューを返す関数"""
+    return padded[..., 1:-1, 1:-1]
+
+
+def allocate_buffers(shape, dtype=np.float64):
+    """
+    step 用の作業配列を確保する関数。
+
+    戻り値:
+    (u のラプラシアン, v のラプラシアン, u*v*v, 一時的な値) をそれぞれ (..., HEIGHT, WIDTH) で。
+    """
+    return tuple(np.empty(shape, dtype=dtype) for _ in range(4))
+
+
+def fill_halo(padded, boundary="periodic", value=0.0):
+    """
+    のりしろ付きの場の最後の2軸について、境界条件に従ってのりしろを埋める関数。
+    5点のラプラシアンには角ののりしろは使わないので、辺だけを埋める。
+    boundary が None のときは何もしない (並列計算での隣の領域など、呼び出す側でのりしろを埋めた場合)。
+    """
+    if boundary is None:
+        return padded
+    if boundary == "periodic":
+        padded[..., 0, 1:-1] = padded[..., -2, 1:-1]
+        padded[..., -1, 1:-1] = padded[..., 1, 1:-1]
+        padded[..., 1:-1, 0] = padded[..., 1:-1, -2]
+        padded[..., 1:-1, -1] = padded[..., 1:-1, 1]
+    elif boundary == "neumann":
+        padded[..., 0, 1:-1] = padded[..., 1, 1:-1]
+        padded[..., -1, 1:-1] = padded[..., -2, 1:-1]
+        padded[..., 1:-1, 0] = padded[..., 1:-1, 1]
+        padded[..., 1:-1, -1] = padded[..., 1:-1, -2]
+    elif boundary == "dirichlet":
+        padded[..., 0, :] = value
+        padded[..., -1, :] = value
+        padded[..., :, 0] = value
+        padded[..., :, -1] = value
+    else:
+        raise ValueError("unknown boundary: {} (choose from {})".format(boundary, BOUNDARIES))
+    return padded
+
+
+def laplacian(padded, out, scale=1.0):
+    """
+    のりしろが埋まった場から、5点差分のラプラシアンに scale を掛けたものを out に書き込む関数。
+    scale に D / dx^2 を与えると、拡散項がそのまま求まる。
+    """
+    np.multiply(padded[..., 1:-1, 1:-1], -4.0, out=out)
+    out += padded[..., :-2, 1:-1]
+    out += padded[..., 2:, 1:-1]
+    out += padded[..., 1:-1, :-2]
+    out += padded[..., 1:-1, 2:]
+    out *= scale
+    return out
+
+
+def time_derivative(u_pad, v_pad, f, k, out_u, out_v, work, Du=2e-5, Dv=1e-5, dx=0.01,
+                    boundary="periodic", boundary_values=(1.0, 0.0)):
+    """
+    Gray-Scott モデルの時間微分を out_u, out_v に書き込む関数 (のりしろも境界条件に従って埋める)。
+        du/dt = Du ∇²u - u v^2 + f (1 - u)
+        dv/dt = Dv ∇²v + u v^2 - (f + k) v
+
+    引数:
+    u_pad, v_pad (np.ndarray): allocate_field で確保したのりしろ付きの場。
+    f, k (float or np.ndarray): パラメタ。配列の場合は内部と同じ形 (場所ごとに異なる値)。
+    out_u, out_v (np.ndarray): 時間微分を書き込む、内部と同じ形の配列。
+    work (tuple): 内部と同じ形の作業配列2つ。
+    boundary (str): 境界条件 ("periodic", "neumann", "dirichlet"、のりしろを埋め済みなら None)。
+    boundary_values (tuple): "dirichlet" のときの u, v ののりしろの値。
+    """
+    uvv, tmp = work
+    fill_halo(u_pad, boundary, boundary_values[0])
+    fill_halo(v_pad, boundary, boundary_values[1])
+    u = u_pad[..., 1:-1, 1:-1]
+    v = v_pad[..., 1:-1, 1:-1]
+    # 拡散項
+    laplacian(u_pad, out_u, Du / (dx * dx))
+    laplacian(v_pad, out_v, Dv / (dx * dx))
+    # 反応項 u*v*v
+    np.multiply(v, v, out=uvv)
+    uvv *= u
+    # du/dt = Du ∇²u - u v^2 + f (1 - u)
+    out_u -= uvv
+    np.subtract(1.0, u, out=tmp)
+    tmp *= f
+    out_u += tmp
+    # dv/dt = Dv ∇²v + u v^2 - (f + k) v
+    out_v += uvv
+    if np.ndim(f) == 0 and np.ndim(k) == 0:
+        np.multiply(v, f + k, out=tmp)
+    else:
+        np.add(f, k, out=tmp)
+        tmp *= v
+    out_v -= tmp
+    return out_u, out_v
+
+
+def step(u_pad, v_pad, f, k, dt, buffers, Du=2e-5, Dv=1e-5, dx=0.01,
+         boundary="periodic", boundary_values=(1.0, 0.0)):
+    """
+    Gray-Scott モデルを前進オイラー法で1ステップ更新する関数 (u_pad, v_pad の内部をその場で書き換える)。
+    引数は time_derivative と同じ。buffers は allocate_buffers で確保した作業配列。
+    """
+    lap_u, lap_v, uvv, tmp = buffers
+    time_derivative(u_pad, v_pad, f, k, lap_u, lap_v, (uvv, tmp), Du, Dv, dx, boundary, boundary_values)
+    # 両方の時間微分を求めてから更新する
+    lap_u *= dt
+    u_pad[..., 1:-1, 1:-1] += lap_u
+    lap_v *= dt
+    v_pad[..., 1:-1, 1:-1] += lap_v
+    return u_pad, v_pad
+
+
+def bytes_per_step(shape, dtype=np.float64, parameter_maps=False):
+    """
+    step (time_derivative と更新) の1回でメモリを読み書きするバイト数 (のりしろの処理は除く) を返す関数。
+    各演算が読む配列と書く配列を1回ずつ数えたもの (キャッシュに載らない大きさの場では、実際の通信量に近い)。
+    ラプラシアン 16 x 2、u*v*v 6、du/dt 10、dv/dt 8 (f, k が配列なら 11 と 12)、更新 5 x 2 回分の配列。
+    """
+    passes = 2 * 16 + 6 + (11 + 12 if parameter_maps else 10 + 8) + 2 * 5
+    return passes * int(np.prod(shape)) * np.dtype(dtype).itemsize
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+(f, k) の格子上の独立な Gray-Scott モデルをまとめて計算する (アンサンブル)
+
+cp_gray_scott_param.py は1つの空間の中で f, k を場所ごとに変えるので、
+隣り合うパラメタの領域どうしが拡散で混ざり合い、純粋なパラメタの探索にはならない。
+ここでは B 個の小さな独立した空間を (B, N, N) の1つの配列に重ね、
+それぞれに自分のスカラーの f, k を (B, 1, 1) の形で与えて、
+cp_gray_scott_engine.step の1回の呼び出しで全てを進める。
+メモリを抑えるため、batch_size 個ずつに分けて計算する (1つのプロセスのまま)。
+"""
+
+import time
+import numpy as np
+from cp_gray_scott_engine import allocate_buffers, allocate_field, interior, step
+from cp_gray_scott_precision import pattern_statistics
+
+# アンサンブルの各パラメタ
+SPACE_GRID_SIZE = 64   # 1つの空間の一辺
+STEPS = 5000
+dt = 1.0
+BATCH_SIZE = 512       # 一度にまとめて計算する空間の数
+SQUARE_SIZE = 10
+
+
+def parameter_grid(f_range=(0.01, 0.06), k_range=(0.04, 0.07), n_f=64, n_k=64):
+    """
+    f, k の格子を作る関数。
+
+    戻り値:
+    (f (n_k * n_f,), k (n_k * n_f,))。k が行、f が列の順に並ぶ。
+    """
+    f, k = np.meshgrid(np.linspace(f_range[0], f_range[1], n_f), np.linspace(k_range[0], k_range[1], n_k))
+    return f.ravel(), k.ravel()
+
+
+def initialize_ensemble(n, size=SPACE_GRID_SIZE, square_size=SQUARE_SIZE, dtype=np.float64, seed=None):
+    """
+    n 個の空間の初期状態 (中央の正方形とノイズ) を、のりしろ付きの場として作る関数。
+    ノイズは空間ごとに独立。
+
+    戻り値:
+    (u_pad, v_pad) それぞれ (n, size+2, size+2)。
+    """
+    rng = np.random.default_rng(seed)
+    u_pad = allocate_field((n, size, size), 1.0, dtype)
+    v_pad = allocate_field((n, size, size), 0.0, dtype)
+    u, v = interior(u_pad), interior(v_pad)
+    y = size // 2 - square_size // 2
+    u[:, y:y+square_size, y:y+square_size] = 0.5
+    v[:, y:y+square_size, y:y+square_size] = 0.25
+    u += rng.random(u.shape, dtype=np.float64).astype(dtype) * 0.1
+    v += rng.random(v.shape, dtype=np.float64).astype(dtype) * 0.1
+    return u_pad, v_pad
+
+
+def run_ensemble(f, k, size=SPACE_GRID_SIZE, steps=STEPS, dt=dt, dtype=np.float64,
+                 boundary="periodic", batch_size=BATCH_SIZE, seed=0):
+    """
+    パラメタ f[i], k[i] の独立な空間をまとめて steps ステップ計算する関数。
+
+    戻り値:
+    (u (B, size, size), v (B, size, size), 空間ごとの統計の dict)。
+    統計は mean_u, mean_v と pattern_statistics の std, active, wavelength で、それぞれ (B,) の配列。
+    """
+    f = np.asarray(f, dtype=dtype)
+    k = np.asarray(k, dtype=dtype)
+    n = len(f)
+    u_all = np.empty((n, size, size), dtype=dtype)
+    v_all = np.empty((n, size, size), dtype=dtype)
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, batch_size):
+        end = min(start + batch_size, n)
+        u_pad, v_pad = initialize_ensemble(end - start, size, dtype=dtype, seed=rng.integers(2**32))
+        buffers = allocate_buffers((end - start, size, size), dtype)
+        f_batch = f[start:end, np.newaxis, np.newaxis]  # (B, 1, 1) で各空間に1つの値
+        k_batch = k[start:end, np.newaxis, np.newaxis]
+        for _ in range(steps):
+            step(u_pad, v_pad, f_batch, k_batch, dt, buffers, boundary=boundary)
+        u_all[start:end] = interior(u_pad)
+        v_all[start:end] = interior(v_pad)
+    statistics = pattern_statistics(u_all, v_all)
+    statistics["mean_u"] = u_all.mean(axis=(-2, -1))
+    statistics["mean_v"] = v_all.mean(axis=(-2, -1))
+    return u_all, v_all, statistics
+
+
+if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
+    N_F, N_K = 64, 64
+    F_RANGE, K_RANGE = (0.01, 0.06), (0.04, 0.07)
+    f, k = parameter_grid(F_RANGE, K_RANGE, N_F, N_K)
+    start = time.perf_counter()
+    u, v, statistics = run_ensemble(f, k, dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    print("{} members of {}x{}, {} steps: {:.1f} s".format(len(f), SPACE_GRID_SIZE, SPACE_GRID_SIZE, STEPS, elapsed))
+
+    extent = (F_RANGE[0], F_RANGE[1], K_RANGE[1], K_RANGE[0])
+    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+    for ax, key, title in zip(axes, ("std", "active", "wavelength"),
+                              ("Std of U", "Active Fraction (V > 0.1)", "Dominant Wavelength (cells)")):
+        im = ax.imshow(statistics[key].reshape(N_K, N_F), extent=extent, aspect='auto')
+        ax.set_xlabel('f')
+        ax.set_ylabel('k')
+        ax.set_title(title)
+        fig.colorbar(im, ax=ax)
+    plt.tight_layout()
+    plt.show()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+複数のプロセスで並列に計算する Gray-Scott モデル (領域分割)
+
+cp_game_of_life_parallel.py と同じく、周期境界条件の空間を横長の帯 (strip) に分け、帯ごとに1つのプロセスが計算する。
+帯の分割、共有メモリ、バリアとハロー交換は cp_strip_parallel.py にまとめてあり、
+ここでは各帯の1ステップの計算 (カーネル) だけを与える。
+各帯は u, v を上下左右1セルずつののりしろ付きで持ち、左右ののりしろはカーネルが周期境界条件で埋める。
+時間微分の計算は cp_gray_scott_engine.time_derivative を使うので、結果は1プロセスの計算と完全に一致する。
+"""
+
+import time
+import numpy as np
+from cp_gray_scott_engine import allocate_buffers, allocate_field, interior, step, time_derivative
+from cp_strip_parallel import run_strips, scaling_table
+
+# モデルの各パラメタ (cp_gray_scott.py と同じ)
+dx = 0.01
+dt = 1.0
+Du = 2e-5
+Dv = 1e-5
+f, k = 0.04, 0.06
+
+
+def _rows(parameter, start, end):
+    """場所ごとのパラメタ (HEIGHT, WIDTH) なら帯の部分を取り出す (スカラーはそのまま)"""
+    return parameter[start:end] if np.ndim(parameter) else parameter
+
+
+def _setup(rows, start, end, width, f, k, dt, Du, Dv, dx):
+    """帯ごとのカーネルを作る (cp_strip_parallel.run_strips の setup)"""
+    lap_u, lap_v, uvv, tmp = allocate_buffers((rows, width))
+    f, k = _rows(f, start, end), _rows(k, start, end)
+
+    def kernel(cur, nxt):
+        # 上下ののりしろは交換済みなので、左右だけ周期境界条件で埋めて計算する
+        cur[:, 1:-1, 0] = cur[:, 1:-1, -2]
+        cur[:, 1:-1, -1] = cur[:, 1:-1, 1]
+        time_derivative(cur[0], cur[1], f, k, lap_u, lap_v, (uvv, tmp), Du, Dv, dx, boundary=None)
+        np.multiply(lap_u, dt, out=lap_u)
+        np.add(cur[0, 1:-1, 1:-1], lap_u, out=nxt[0, 1:-1, 1:-1])
+        np.multiply(lap_v, dt, out=lap_v)
+        np.add(cur[1, 1:-1, 1:-1], lap_v, out=nxt[1, 1:-1, 1:-1])
+    return kernel
+
+
+def run_parallel(u, v, steps, n_workers, f=f, k=k, dt=dt, Du=Du, Dv=Dv, dx=dx):
+    """
+    u, v (HEIGHT, WIDTH) を n_workers 個のプロセスで steps ステップ計算する関数 (周期境界条件)。
+    f, k はスカラーか、(HEIGHT, WIDTH) の場所ごとのパラメタ。
+
+    戻り値:
+    (u, v, 計算にかかった時間 (秒))
+    """
+    fields = np.stack([u, v]).astype(np.float64)
+    result, elapsed = run_strips(fields, steps, n_workers, _setup, (u.shape[1], f, k, dt, Du, Dv, dx),
+                                 halo_columns=1)
+    return result[0], result[1], elapsed
+
+
+def strong_scaling(size=2048, steps=50, max_workers=None, seed=0):
+    """
+    同じ問題を1からmax_workers個のプロセスで計算し、時間と速度向上率を表示する関数。
+    8192x8192 以上の空間でも同じように使える (共有メモリは 32 * size^2 バイト程度必要)。
+    結果が1プロセスの計算 (cp_gray_scott_engine.step) と完全に一致することも確認する。
+    """
+    rng = np.random.RandomState(seed)
+    u = 1 - 0.5 * rng.rand(size, size)
+    v = 0.25 * rng.rand(size, size)
+
+    u_pad, v_pad = allocate_field(u.shape, 1.0), allocate_field(v.shape, 0.0)
+    interior(u_pad)[...] = u
+    interior(v_pad)[...] = v
+    buffers = allocate_buffers(u.shape)
+    start = time.perf_counter()
+    for _ in range(steps):
+        step(u_pad, v_pad, f, k, dt, buffers, Du, Dv, dx)
+    serial = time.perf_counter() - start
+    print("serial   : {:.3f} s".format(serial))
+
+    def run(n):
+        u_result, v_result, elapsed = run_parallel(u, v, steps, n)
+        assert np.array_equal(u_result, interior(u_pad)) and np.array_equal(v_result, interior(v_pad))
+        return elapsed
+    return serial, scaling_table(run, max_workers)
+
+
+if __name__ == '__main__':
+    strong_scaling()
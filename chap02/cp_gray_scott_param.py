@@ -68,7 +68,9 @@
 import sys, os
 sys.path.append(os.pardir)
 import numpy as np
-# import matplotlib.pyplot as plt
+import matplotlib.pyplot as plt
+from cp_gray_scott_engine import allocate_buffers, allocate_field, interior, step
+from cp_frame_pipeline import FramePipeline, run_pipeline
 
 
 # シミュレーションの各パラメタ
@@ -93,9 +95,11 @@ f_lin = np.linspace(f_min, f_max, SPACE_GRID_SIZE)
 k_lin = np.linspace(k_min, k_max, SPACE_GRID_SIZE)
 f, k = np.meshgrid(f_lin, k_lin)
 
-# 初期化
-u = np.ones((SPACE_GRID_SIZE, SPACE_GRID_SIZE))
-v = np.zeros((SPACE_GRID_SIZE, SPACE_GRID_SIZE))
+# 初期化 (u, v はのりしろ付きの配列の内部のビュー。cp_gray_scott_engine.py 参照)
+u_pad = allocate_field((SPACE_GRID_SIZE, SPACE_GRID_SIZE), 1.0)
+v_pad = allocate_field((SPACE_GRID_SIZE, SPACE_GRID_SIZE), 0.0)
+u = interior(u_pad)
+v = interior(v_pad)
 # 中央に正方形を置く
 SQUARE_SIZE = 20
 u[SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2,
@@ -103,8 +107,9 @@ u[SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2,
 v[SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2,
   SPACE_GRID_SIZE//2-SQUARE_SIZE//2:SPACE_GRID_SIZE//2+SQUARE_SIZE//2] = 0.25
 # ノイズを加える
-u = u + u*np.random.rand(SPACE_GRID_SIZE, SPACE_GRID_SIZE)*0.01
-v = v + u*np.random.rand(SPACE_GRID_SIZE, SPACE_GRID_SIZE)*0.01
+u += u*np.random.rand(SPACE_GRID_SIZE, SPACE_GRID_SIZE)*0.01
+v += u*np.random.rand(SPACE_GRID_SIZE, SPACE_GRID_SIZE)*0.01
+buffers = allocate_buffers(u.shape)  # 作業配列はループの外で一度だけ確保する
 
 plt.ion()  # インタラクティブモードをオン
 
@@ -131,28 +136,26 @@ text_k_max = axes[0].text(0.05, 0.05, f'k_max={k_max:.3f}', color='white', trans
 plt.tight_layout()
 plt.show()
 
-while plt.fignum_exists(fig.number):
-    for i in range(VISUALIZATION_STEP):
-        # ラプラシアンの計算
-        u_pad = np.pad(u, 1, 'edge')
-        v_pad = np.pad(v, 1, 'edge')
-        laplacian_u = (np.roll(u_pad, 1, axis=0) + np.roll(u_pad, -1, axis=0) +
-                       np.roll(u_pad, 1, axis=1) + np.roll(u_pad, -1, axis=1) - 4*u_pad) / (dx*dx)
-        laplacian_v = (np.roll(v_pad, 1, axis=0) + np.roll(v_pad, -1, axis=0) +
-                       np.roll(v_pad, 1, axis=1) + np.roll(v_pad, -1, axis=1) - 4*v_pad) / (dx*dx)
-        laplacian_u = laplacian_u[1:-1,1:-1]
-        laplacian_v = laplacian_v[1:-1,1:-1]
-        # Gray-Scottモデル方程式
-        dudt = Du*laplacian_u - u*v*v + f*(1.0-u)
-        dvdt = Dv*laplacian_v + u*v*v - (f+k)*v
-        u += dt * dudt
-        v += dt * dvdt
-
-    # 表示をアップデート
-    im_u.set_array(u)
+def solve(pipeline, stop):
+    # 計算は別のスレッドで行い、VISUALIZATION_STEP ステップごとに u を pipeline に渡すだけで描画を待たない
+    # (描画が追いつかないフレームは捨てられる。cp_frame_pipeline.py 参照)
+    while not stop.is_set():
+        for i in range(VISUALIZATION_STEP):
+            # 空間の両境界でパラメタが急に変化するため周期境界条件は不適切なので、対称境界条件 (neumann) を使う
+            step(u_pad, v_pad, f, k, dt, buffers, Du, Dv, dx, boundary="neumann")
+        pipeline.publish(u)
+
+
+def render(frame, info):
+    # 表示をアップデート (メインスレッドで行う)
+    im_u.set_array(frame)
     fig.canvas.draw()
     fig.canvas.flush_events()
 
+
+pipeline = FramePipeline(u.shape)
+run_pipeline(solve, pipeline, render, alive=lambda: plt.fignum_exists(fig.number))
+
 plt.ioff()
 
 
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gray-Scott モデルの単精度 (float32) 計算の検証
+
+Gray-Scott モデルのステンシル計算はメモリの読み書きの速さで決まるので、
+u, v と作業配列を float32 にすると、読み書きの量が半分になり速くなる。
+ただし丸め誤差が積み重なって、float64 の結果から少しずつずれていく (drift)。
+validate_precision は同じ初期状態から float64 と float32 で N ステップ計算し、
+その差と、パターンの特徴 (pattern_statistics) が変わらないかを調べる。
+パターンの種類が変わらない (f, k) の範囲では、パラメタの探索などに float32 を使ってよい。
+"""
+
+import time
+import numpy as np
+from cp_gray_scott_engine import allocate_buffers, allocate_field, interior, step
+from cp_gray_scott_spectral import initialize_state
+
+# 検証の各パラメタ
+SPACE_GRID_SIZE = 128
+STEPS = 10000
+dt = 1.0
+# パターンの特徴がこれ以上ずれたら、パターンの種類が変わったとみなす
+ACTIVE_TOLERANCE = 0.05      # v > ACTIVE_THRESHOLD の領域の割合の差
+WAVELENGTH_TOLERANCE = 0.15  # 主な波長の相対的な差
+ACTIVE_THRESHOLD = 0.1
+HOMOGENEOUS_STD = 1e-3       # u の標準偏差がこれより小さければ一様な状態
+
+
+def run(u0, v0, f, k, steps, dt=dt, dtype=np.float64, boundary="periodic"):
+    """
+    初期状態 u0, v0 から、精度 dtype で steps ステップ計算する関数。
+
+    戻り値:
+    (u, v, 計算にかかった時間 (秒))
+    """
+    u_pad = allocate_field(u0.shape, 1.0, dtype)
+    v_pad = allocate_field(v0.shape, 0.0, dtype)
+    interior(u_pad)[...] = u0
+    interior(v_pad)[...] = v0
+    buffers = allocate_buffers(u0.shape, dtype)
+    # 場所ごとのパラメタも同じ精度にしておく (float64 のままだと読み書きの量が減らない)
+    f = np.asarray(f, dtype=dtype) if np.ndim(f) else f
+    k = np.asarray(k, dtype=dtype) if np.ndim(k) else k
+    start = time.perf_counter()
+    for _ in range(steps):
+        step(u_pad, v_pad, f, k, dt, buffers, boundary=boundary)
+    elapsed = time.perf_counter() - start
+    return interior(u_pad).copy(), interior(v_pad).copy(), elapsed
+
+
+def pattern_statistics(u, v):
+    """
+    パターンの特徴を計算する関数。u, v は (..., HEIGHT, WIDTH) で、前の軸はバッチとしてまとめて計算する。
+
+    戻り値:
+    dict。std: u の空間的な標準偏差、active: v > ACTIVE_THRESHOLD の領域の割合、
+    wavelength: u のパワースペクトルが最大になる波長 (セル数、一様な状態では 0)。
+    値はバッチの形の配列 (u が2次元ならスカラー)。
+    """
+    u = np.asarray(u, dtype=np.float64)
+    height, width = u.shape[-2:]
+    mean = u.mean(axis=(-2, -1), keepdims=True)
+    std = np.sqrt(np.mean((u - mean)**2, axis=(-2, -1)))
+    power = np.abs(np.fft.rfft2(u - mean))**2
+    # 動径方向に平均したパワースペクトル: 波数の大きさごとにまとめて平均する
+    ky = np.fft.fftfreq(height)
+    kx = np.fft.rfftfreq(width)
+    bins = np.rint(np.sqrt(ky[:, np.newaxis]**2 + kx[np.newaxis, :]**2) * max(height, width)).astype(int).ravel()
+    order = np.argsort(bins, kind='stable')
+    starts = np.searchsorted(bins[order], np.arange(bins.max() + 1))
+    power = power.reshape(power.shape[:-2] + (-1,))[..., order]
+    spectrum = np.add.reduceat(power, starts, axis=-1) / np.bincount(bins)
+    peak = np.argmax(spectrum[..., 1:], axis=-1) + 1  # 波数 0 は除く
+    # np.where は u が2次元でも0次元の配列を返すので、[()] で std, active と同じスカラーにする
+    wavelength = np.where(std > HOMOGENEOUS_STD, max(height, width) / peak, 0.0)[()]
+    active = np.mean(np.asarray(v) > ACTIVE_THRESHOLD, axis=(-2, -1))
+    return {"std": std, "active": active, "wavelength": wavelength}
+
+
+def same_pattern(a, b):
+    """pattern_statistics の結果 a, b が同じ種類のパターンを表すかどうか (バッチならまとめて判定する)"""
+    homogeneous_a, homogeneous_b = a["std"] <= HOMOGENEOUS_STD, b["std"] <= HOMOGENEOUS_STD
+    similar = ((np.abs(a["active"] - b["active"]) <= ACTIVE_TOLERANCE) &
+               (np.abs(a["wavelength"] - b["wavelength"]) <=
+                WAVELENGTH_TOLERANCE * np.maximum(a["wavelength"], b["wavelength"])))
+    return np.where(homogeneous_a | homogeneous_b, homogeneous_a & homogeneous_b, similar)
+
+
+def validate_precision(f, k, steps=STEPS, size=SPACE_GRID_SIZE, dt=dt, seed=0, boundary="periodic"):
+    """
+    (f, k) について float64 と float32 で steps ステップ計算し、差を調べる関数。
+
+    戻り値:
+    dict。max_u/max_v: 差の絶対値の最大、rms_u/rms_v: 差の RMS、
+    float64/float32: それぞれの pattern_statistics、same_pattern: パターンの種類が同じか、
+    speedup: float32 が float64 の何倍速かったか。
+    """
+    u0, v0 = initialize_state((size, size), seed=seed)
+    u64, v64, time64 = run(u0, v0, f, k, steps, dt, np.float64, boundary)
+    u32, v32, time32 = run(u0, v0, f, k, steps, dt, np.float32, boundary)
+    du, dv = u32 - u64, v32 - v64
+    stats64, stats32 = pattern_statistics(u64, v64), pattern_statistics(u32, v32)
+    return {
+        "max_u": float(np.abs(du).max()), "max_v": float(np.abs(dv).max()),
+        "rms_u": float(np.sqrt(np.mean(du**2))), "rms_v": float(np.sqrt(np.mean(dv**2))),
+        "float64": stats64, "float32": stats32,
+        "same_pattern": bool(same_pattern(stats64, stats32)),
+        "speedup": time64 / time32,
+    }
+
+
+if __name__ == '__main__':
+    PARAMETERS = [(0.022, 0.051, "stripes"), (0.035, 0.065, "spots"), (0.04, 0.06, "amorphous"),
+                  (0.012, 0.05, "waves"), (0.06, 0.07, "homogeneous")]
+    for f, k, name in PARAMETERS:
+        result = validate_precision(f, k)
+        print("{:>11s} (f={}, k={}): max |du|={:.1e}, rms du={:.1e}, same pattern: {}, "
+              "wavelength {:.1f} / {:.1f}, speedup {:.2f}".format(
+                  name, f, k, result["max_u"], result["rms_u"], result["same_pattern"],
+                  result["float64"]["wavelength"], result["float32"]["wavelength"], result["speedup"]))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gray-Scott モデルのスペクトル法 (指数時間差分法, ETD) による計算
+
+前進オイラー法では、拡散項のために dt < dx^2 / (4 D) 程度でないと計算が発散する。
+そこで方程式を線形の部分 L と非線形の部分 N に分け、
+    du/dt = L_u u + N_u,  L_u = Du ∇² - f,      N_u = -u v^2 + f
+    dv/dt = L_v v + N_v,  L_v = Dv ∇² - (f+k),  N_v =  u v^2
+線形の部分はフーリエ空間で厳密に (exp(L dt) を掛けて) 解き、非線形の部分だけを陽に計算する。
+∇² のフーリエ空間での値には5点差分の固有値を使うので、dt を小さくすると
+cp_gray_scott_engine.py (周期境界条件) と同じ解に近づく。
+exp(L dt) などの係数 (propagator) は (空間の大きさ, dt, D, f, k, dx) ごとに一度だけ計算してキャッシュする。
+
+scheme は "etd1" (指数オイラー法, 1次) と "etdrk2" (Cox-Matthews の ETD2RK 法, 2次) から選べる。
+周期境界条件で、f, k はスカラーのみ。
+"""
+
+import numpy as np
+
+# モデルの各パラメタ (cp_gray_scott.py と同じ)
+SPACE_GRID_SIZE = 256
+dx = 0.01
+Du = 2e-5
+Dv = 1e-5
+f, k = 0.04, 0.06
+
+_propagator_cache = {}
+
+
+def laplacian_symbol(shape, dx):
+    """
+    周期境界条件での5点差分ラプラシアンの固有値を、rfft2 の並びで返す関数。
+    (2cos(kx dx) - 2 + 2cos(ky dx) - 2) / dx^2
+    """
+    height, width = shape
+    ky = 2 * np.pi * np.fft.fftfreq(height)
+    kx = 2 * np.pi * np.fft.rfftfreq(width)
+    return ((2 * np.cos(ky) - 2)[:, np.newaxis] + (2 * np.cos(kx) - 2)[np.newaxis, :]) / (dx * dx)
+
+
+def propagators(shape, dt, D, decay, dx):
+    """
+    L = D ∇² - decay について exp(L dt), φ1 = (exp(L dt) - 1) / L,
+    φ2 = (exp(L dt) - 1 - L dt) / (L^2 dt) を返す関数。同じ引数の結果はキャッシュする。
+    L dt が0に近いところでは、桁落ちを避けるためにテイラー展開を使う。
+    """
+    key = (tuple(shape), dt, D, decay, dx)
+    result = _propagator_cache.get(key)
+    if result is None:
+        L = D * laplacian_symbol(shape, dx) - decay
+        z = L * dt
+        small = np.abs(z) < 1e-4
+        safe_L = np.where(small, 1.0, L)
+        exp_z = np.exp(z)
+        phi1 = np.where(small, dt * (1 + z / 2 + z * z / 6), np.expm1(z) / safe_L)
+        phi2 = np.where(small, dt * (0.5 + z / 6 + z * z / 24), (np.expm1(z) - z) / (safe_L * safe_L * dt))
+        result = (exp_z, phi1, phi2)
+        _propagator_cache[key] = result
+    return result
+
+
+def nonlinear(u, v, f, out_u, out_v):
+    """非線形の部分 N_u = -u v^2 + f, N_v = u v^2 を out_u, out_v に書き込む関数"""
+    np.multiply(v, v, out=out_v)
+    out_v *= u
+    np.subtract(f, out_v, out=out_u)
+    return out_u, out_v
+
+
+def step(u, v, dt, f=f, k=k, Du=Du, Dv=Dv, dx=dx, scheme="etdrk2", work=None):
+    """
+    u, v (HEIGHT, WIDTH) を時間 dt だけ進める関数 (u, v をその場で書き換える)。
+    work には u と同じ形の配列4つを与えると使い回す。
+    """
+    if work is None:
+        work = tuple(np.empty_like(u) for _ in range(4))
+    n_u, n_v, a_u, a_v = work
+    e_u, phi1_u, phi2_u = propagators(u.shape, dt, Du, f, dx)
+    e_v, phi1_v, phi2_v = propagators(v.shape, dt, Dv, f + k, dx)
+    shape = u.shape
+
+    nonlinear(u, v, f, n_u, n_v)
+    u_hat, v_hat = np.fft.rfft2(u), np.fft.rfft2(v)
+    nu_hat, nv_hat = np.fft.rfft2(n_u), np.fft.rfft2(n_v)
+    # 指数オイラー法: a = exp(L dt) u + φ1 N(u)
+    au_hat = e_u * u_hat + phi1_u * nu_hat
+    av_hat = e_v * v_hat + phi1_v * nv_hat
+    if scheme == "etd1":
+        u[...] = np.fft.irfft2(au_hat, s=shape)
+        v[...] = np.fft.irfft2(av_hat, s=shape)
+    elif scheme == "etdrk2":
+        # 2段目: u_{n+1} = a + φ2 (N(a) - N(u))
+        a_u[...] = np.fft.irfft2(au_hat, s=shape)
+        a_v[...] = np.fft.irfft2(av_hat, s=shape)
+        nonlinear(a_u, a_v, f, n_u, n_v)
+        au_hat += phi2_u * (np.fft.rfft2(n_u) - nu_hat)
+        av_hat += phi2_v * (np.fft.rfft2(n_v) - nv_hat)
+        u[...] = np.fft.irfft2(au_hat, s=shape)
+        v[...] = np.fft.irfft2(av_hat, s=shape)
+    else:
+        raise ValueError("unknown scheme: {}".format(scheme))
+    return u, v
+
+
+def initialize_state(shape=(SPACE_GRID_SIZE, SPACE_GRID_SIZE), square_size=20, seed=None):
+    """cp_gray_scott.py と同じ初期状態 (中央の正方形とノイズ) を作る関数"""
+    rng = np.random.RandomState(seed)
+    u = np.ones(shape)
+    v = np.zeros(shape)
+    y, x = shape[0] // 2 - square_size // 2, shape[1] // 2 - square_size // 2
+    u[y:y+square_size, x:x+square_size] = 0.5
+    v[y:y+square_size, x:x+square_size] = 0.25
+    u += rng.rand(*shape) * 0.1
+    v += rng.rand(*shape) * 0.1
+    return u, v
+
+
+if __name__ == '__main__':
+    import time
+    from cp_gray_scott_engine import allocate_buffers, allocate_field, interior
+    from cp_gray_scott_engine import step as euler_step
+
+    T_END = 500
+    u0, v0 = initialize_state(seed=0)
+
+    def run_euler(dt):
+        u_pad = allocate_field(u0.shape, 1.0)
+        v_pad = allocate_field(v0.shape, 0.0)
+        interior(u_pad)[...] = u0
+        interior(v_pad)[...] = v0
+        buffers = allocate_buffers(u0.shape)
+        with np.errstate(over='ignore', invalid='ignore'):
+            for _ in range(int(round(T_END / dt))):
+                euler_step(u_pad, v_pad, f, k, dt, buffers, Du, Dv, dx)
+        return interior(u_pad).copy()
+
+    def run_spectral(dt):
+        u, v = u0.copy(), v0.copy()
+        work = tuple(np.empty_like(u) for _ in range(4))
+        for _ in range(int(round(T_END / dt))):
+            step(u, v, dt, work=work)
+        return u
+
+    # 基準: 十分小さい dt の前進オイラー法
+    reference = run_euler(0.1)
+    for name, run, dt in [("euler ", run_euler, 1), ("euler ", run_euler, 2),
+                          ("etdrk2", run_spectral, 1), ("etdrk2", run_spectral, 5),
+                          ("etdrk2", run_spectral, 10), ("etdrk2", run_spectral, 25)]:
+        start = time.perf_counter()
+        u = run(dt)
+        elapsed = time.perf_counter() - start
+        difference = np.sqrt(np.mean((u - reference)**2))  # 発散した場合は nan
+        print("{} dt={:<2d}: {:4d} steps, {:.2f} s, RMS difference {:.2e}".format(
+            name, dt, int(round(T_END / dt)), elapsed, difference))
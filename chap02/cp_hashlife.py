@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+HashLife によるライフゲームの長時間計算
+
+空間を四分木 (quadtree) で表し、同じ形のノードは1つだけ作る (ハッシュによる正規化)。
+ノードの「中央部分を 2^j 世代進めた結果」(RESULT) をメモ化しておくと、
+GLIDER_GUN のような規則的なパターンでは同じ計算が何度も再利用されるので、
+10^6 世代以上を一気に (2^k 世代ずつ) 進めることができる。
+RESULT のキャッシュは MAX_RESULT_CACHE_SIZE を超えると古いものから捨てる。
+
+cp_game_of_life.py とは違い、空間は周期境界ではなく無限に広い平面として扱う。
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+# RESULT のキャッシュに保存するノードの数の上限
+MAX_RESULT_CACHE_SIZE = 1000000
+
+
+class Node(object):
+    """
+    四分木のノード。level k のノードは 2^k x 2^k のセルを表し、
+    a (左上), b (右上), c (左下), d (右下) の4つの level k-1 のノードからなる。
+    population は生きているセルの数。
+    ノードは join を通して作ると正規化され、同じ形のノードは同じオブジェクトになる。
+    """
+    __slots__ = ('level', 'a', 'b', 'c', 'd', 'population')
+
+    def __init__(self, level, a, b, c, d, population):
+        self.level = level
+        self.a = a
+        self.b = b
+        self.c = c
+        self.d = d
+        self.population = population
+
+# level 0 のノード (1セル)
+OFF = Node(0, None, None, None, None, 0)
+ON = Node(0, None, None, None, None, 1)
+
+_nodes = {}  # 正規化のためのテーブル (4つの子ノード -> ノード)
+_zeros = [OFF]  # level ごとの空のノード
+_results = OrderedDict()  # RESULT のキャッシュ ((ノード, j) -> 中央部分を 2^j 世代進めたノード)
+
+
+def join(a, b, c, d):
+    """4つの子ノードから (正規化された) 親ノードを返す関数"""
+    key = (a, b, c, d)
+    node = _nodes.get(key)
+    if node is None:
+        node = Node(a.level + 1, a, b, c, d, a.population + b.population + c.population + d.population)
+        _nodes[key] = node
+    return node
+
+
+def zero(level):
+    """level の空のノード"""
+    while len(_zeros) <= level:
+        z = _zeros[-1]
+        _zeros.append(join(z, z, z, z))
+    return _zeros[level]
+
+
+def centre(node):
+    """node を中央に置いた、1つ大きい level のノードを返す関数"""
+    z = zero(node.level - 1)
+    return join(join(z, z, z, node.a), join(z, z, node.b, z),
+                join(z, node.c, z, z), join(node.d, z, z, z))
+
+
+def clear_caches():
+    """正規化のテーブルと RESULT のキャッシュを空にする関数"""
+    _nodes.clear()
+    _results.clear()
+    del _zeros[1:]
+
+
+def _life_4x4(node):
+    """level 2 (4x4) のノードの中央 2x2 を1世代進めた level 1 のノードを返す関数"""
+    cells = to_array(node)
+    next_cells = []
+    for y in (1, 2):
+        for x in (1, 2):
+            s = cells[y-1:y+2, x-1:x+2].sum() - cells[y, x]
+            alive = (cells[y, x] == 0 and s == 3) or (cells[y, x] == 1 and s in (2, 3))
+            next_cells.append(ON if alive else OFF)
+    return join(*next_cells)
+
+
+def successor(node, j):
+    """
+    level k のノードの中央 2^(k-1) x 2^(k-1) の部分を 2^j 世代進めたノードを返す関数 (j <= k-2)。
+    結果は RESULT のキャッシュにメモ化する。
+    """
+    if node.population == 0:
+        return node.a
+    key = (node, j)
+    result = _results.get(key)
+    if result is not None:
+        _results.move_to_end(key)
+        return result
+
+    if node.level == 2:
+        result = _life_4x4(node)
+    else:
+        a, b, c, d = node.a, node.b, node.c, node.d
+        # 重なり合う9つの level k-1 のノード
+        parts = [join(a.a, a.b, a.c, a.d), join(a.b, b.a, a.d, b.c), join(b.a, b.b, b.c, b.d),
+                 join(a.c, a.d, c.a, c.b), join(a.d, b.c, c.b, d.a), join(b.c, b.d, d.a, d.b),
+                 join(c.a, c.b, c.c, c.d), join(c.b, d.a, c.d, d.c), join(d.a, d.b, d.c, d.d)]
+        if j < node.level - 2:
+            # 2^j 世代は1回の successor で足りるので、9つの結果 (level k-2) から中央を組み立てる
+            c1, c2, c3, c4, c5, c6, c7, c8, c9 = [successor(p, j) for p in parts]
+            result = join(join(c1.d, c2.c, c4.b, c5.a), join(c2.d, c3.c, c5.b, c6.a),
+                          join(c4.d, c5.c, c7.b, c8.a), join(c5.d, c6.c, c8.b, c9.a))
+        else:
+            # 2^(k-3) 世代ずつ2回進めて 2^(k-2) 世代とする
+            c1, c2, c3, c4, c5, c6, c7, c8, c9 = [successor(p, j - 1) for p in parts]
+            result = join(successor(join(c1, c2, c4, c5), j - 1), successor(join(c2, c3, c5, c6), j - 1),
+                          successor(join(c4, c5, c7, c8), j - 1), successor(join(c5, c6, c8, c9), j - 1))
+
+    _results[key] = result
+    if len(_results) > MAX_RESULT_CACHE_SIZE:
+        _results.popitem(last=False)  # 一番長く使われていないものを捨てる
+    return result
+
+
+def from_array(array):
+    """
+    0/1 の2次元配列から四分木を作る関数。
+    配列は 2^k x 2^k の正方形の左上に置き、足りない部分は0で埋める。
+    """
+    size = max(array.shape + (4,))
+    level = int(np.ceil(np.log2(size)))
+    cells = np.zeros((2**level, 2**level), dtype=np.int8)
+    cells[:array.shape[0], :array.shape[1]] = array
+
+    def build(y, x, level):
+        if level == 0:
+            return ON if cells[y, x] else OFF
+        half = 2**(level - 1)
+        if not cells[y:y+2*half, x:x+2*half].any():
+            return zero(level)
+        return join(build(y, x, level-1), build(y, x+half, level-1),
+                    build(y+half, x, level-1), build(y+half, x+half, level-1))
+    return build(0, 0, level)
+
+
+def to_array(node, top=0, left=0, height=None, width=None, out=None):
+    """
+    四分木のうち、(top, left) から height x width の範囲を np.int8 の配列に書き出す関数。
+    座標はノードの左上を (0, 0) とする。空の部分は調べないので、大きなノードの一部分も速く取り出せる。
+    """
+    size = 2**node.level
+    if height is None:
+        height = size - top
+    if width is None:
+        width = size - left
+    if out is None:
+        out = np.zeros((height, width), dtype=np.int8)
+
+    def fill(node, y, x):
+        # (y, x) はノードの左上の、書き出す配列の中での位置
+        size = 2**node.level
+        if node.population == 0 or y >= height or x >= width or y + size <= 0 or x + size <= 0:
+            return
+        if node.level == 0:
+            out[y, x] = 1
+            return
+        half = size // 2
+        fill(node.a, y, x)
+        fill(node.b, y, x + half)
+        fill(node.c, y + half, x)
+        fill(node.d, y + half, x + half)
+    fill(node, -top, -left)
+    return out
+
+
+def _is_padded(node):
+    """生きたセルが全て、ノードの中央 1/4 x 1/4 の範囲 (4つの子のそれぞれ中央側の隅の、一辺 1/8 の正方形) にあるかどうか"""
+    return (node.level >= 3 and
+            node.a.population == node.a.d.d.population and
+            node.b.population == node.b.c.c.population and
+            node.c.population == node.c.b.b.population and
+            node.d.population == node.d.a.a.population)
+
+
+class HashLife(object):
+    """
+    HashLife でライフゲームを計算するクラス。
+    世界の座標は、最初に与えた配列の左上を (0, 0) とする。
+
+    使い方:
+    life = HashLife(GLIDER_GUN)
+    life.advance(10**6)
+    window = life.to_array(top, left, height, width)
+    """
+    def __init__(self, array):
+        self.root = from_array(array)
+        self.top = 0  # root の左上の世界座標
+        self.left = 0
+        self.generation = 0
+
+    def _centre(self):
+        half = 2**(self.root.level - 1)
+        self.root = centre(self.root)
+        self.top -= half
+        self.left -= half
+
+    def step_pow2(self, k):
+        """2^k 世代を一度に進める"""
+        # 生きたセルが中央 1/4 x 1/4 に収まるまで広げ、2^k 世代後もはみ出さないようにする
+        while not _is_padded(self.root):
+            self._centre()
+        self._centre()
+        while self.root.level < k + 3:
+            self._centre()
+        quarter = 2**(self.root.level - 2)
+        self.root = successor(self.root, k)
+        self.top += quarter
+        self.left += quarter
+        self.generation += 2**k
+
+    def advance(self, generations):
+        """generations 世代進める (2進数で展開し、2^k 世代ずつ進める)"""
+        k = 0
+        while generations:
+            if generations & 1:
+                self.step_pow2(k)
+            generations >>= 1
+            k += 1
+
+    @property
+    def population(self):
+        return self.root.population
+
+    def to_array(self, top, left, height, width):
+        """世界座標の (top, left) から height x width の範囲を np.int8 の配列として返す"""
+        return to_array(self.root, top - self.top, left - self.left, height, width)
+
+
+if __name__ == '__main__':
+    import sys, os
+    sys.path.append(os.pardir)
+    import time
+    from alifebook_lib.visualizers import MatrixVisualizer
+    from cp_game_of_life import GLIDER_GUN
+
+    # 2^STEP_EXPONENT 世代ずつ進めながら、グライダーガンの周りの窓を表示する
+    STEP_EXPONENT = 3
+    WINDOW_HEIGHT, WINDOW_WIDTH = 256, 256
+    visualizer = MatrixVisualizer()
+    life = HashLife(GLIDER_GUN)
+    while visualizer:
+        life.step_pow2(STEP_EXPONENT)
+        window = life.to_array(-16, -16, WINDOW_HEIGHT, WINDOW_WIDTH)
+        visualizer.update(1-window)
+        time.sleep(0.05)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lenia (連続値・連続時間・連続空間のセルオートマトン)
+
+ライフゲームの「周りの生きたセルの数」を、半径 R の滑らかなリング状のカーネルとの畳み込み (ポテンシャル) に、
+誕生・生存のルールを、ポテンシャルに対する滑らかな成長関数に置き換えたもの。
+状態 A (0から1の実数) を A <- clip(A + dt * G(K * A), 0, 1) で更新する。
+
+畳み込みは FFT で計算する。カーネルのフーリエ変換 (スペクトル) は
+(空間の大きさ, 半径, ピーク, コアの種類) ごとに一度だけ計算してキャッシュするので、
+1ステップの計算は FFT 2回と掛け算だけになり、半径を大きくしても計算時間は変わらない。
+"""
+
+import sys, os
+sys.path.append(os.pardir)
+import numpy as np
+
+# シミュレーションの各パラメタ
+SPACE_GRID_SIZE = 256
+VISUALIZATION_STEP = 4  # 何ステップごとに画面を更新するか。
+
+# モデルの各パラメタ
+R = 13             # カーネルの半径 (セル)
+PEAKS = (1.0,)     # リングごとの高さ (例: (0.5, 1.0, 0.667) で3重のリング)
+KERNEL_CORE = "exponential"
+GROWTH = "exponential"
+MU = 0.15          # 成長関数の中心
+SIGMA = 0.015      # 成長関数の幅
+T = 10             # dt = 1/T
+
+_spectrum_cache = {}
+
+
+def kernel_core(r, kind=KERNEL_CORE):
+    """
+    0から1の距離 r に対するリングの形を返す関数 (r の配列に対してまとめて計算する)。
+    "exponential": exp(4 - 1/(r(1-r))), "polynomial": (4r(1-r))^4, "rectangular": 1/4 <= r <= 3/4 で 1
+    """
+    r = np.asarray(r, dtype=np.float64)
+    inside = (r > 0) & (r < 1)
+    if kind == "exponential":
+        return np.where(inside, np.exp(4 - 1 / np.where(inside, r * (1 - r), 1)), 0.0)
+    elif kind == "polynomial":
+        return np.where(inside, (4 * r * (1 - r)) ** 4, 0.0)
+    elif kind == "rectangular":
+        return ((r >= 0.25) & (r <= 0.75)).astype(np.float64)
+    raise ValueError("unknown kernel core: {}".format(kind))
+
+
+def make_kernel(shape, radius=R, peaks=PEAKS, kind=KERNEL_CORE):
+    """
+    周期境界条件の空間 shape の上に、原点を中心とする半径 radius のカーネルを作る関数。
+    和が1になるように正規化する。
+    """
+    height, width = shape
+    y = np.fft.fftfreq(height, 1.0 / height)  # 0, 1, ..., -2, -1 (原点からの周期的な距離)
+    x = np.fft.fftfreq(width, 1.0 / width)
+    distance = np.sqrt(y[:, np.newaxis]**2 + x[np.newaxis, :]**2) / radius
+    # B 重のリング: 距離 distance * B の整数部分がリングの番号、小数部分がリングの中での位置
+    n_rings = len(peaks)
+    scaled = distance * n_rings
+    ring = np.minimum(scaled.astype(int), n_rings - 1)
+    kernel = np.asarray(peaks)[ring] * kernel_core(scaled - ring, kind)
+    kernel[distance >= 1] = 0
+    return kernel / kernel.sum()
+
+
+def kernel_spectrum(shape, radius=R, peaks=PEAKS, kind=KERNEL_CORE):
+    """カーネルのフーリエ変換 (rfft2) を返す関数。同じ引数の結果はキャッシュする。"""
+    key = (tuple(shape), radius, tuple(peaks), kind)
+    spectrum = _spectrum_cache.get(key)
+    if spectrum is None:
+        spectrum = np.fft.rfft2(make_kernel(shape, radius, peaks, kind))
+        _spectrum_cache[key] = spectrum
+    return spectrum
+
+
+def growth(potential, mu=MU, sigma=SIGMA, kind=GROWTH, out=None):
+    """
+    ポテンシャルから成長率 (-1から1) を計算する関数。out を与えるとそこに書き込む。
+    "exponential": 2 exp(-(U-mu)^2 / 2sigma^2) - 1
+    "polynomial": 2 max(0, 1 - (U-mu)^2 / 9sigma^2)^4 - 1
+    "step": |U-mu| <= sigma なら 1、それ以外は -1
+    """
+    if out is None:
+        out = np.empty_like(potential)
+    np.subtract(potential, mu, out=out)
+    if kind == "exponential":
+        out *= out
+        out *= -1 / (2 * sigma**2)
+        np.exp(out, out=out)
+    elif kind == "polynomial":
+        out *= out
+        out *= -1 / (9 * sigma**2)
+        out += 1
+        np.maximum(out, 0, out=out)
+        out **= 4
+    elif kind == "step":
+        np.abs(out, out=out)
+        out[...] = out <= sigma
+    else:
+        raise ValueError("unknown growth function: {}".format(kind))
+    out *= 2
+    out -= 1
+    return out
+
+
+def step(state, spectrum, mu=MU, sigma=SIGMA, dt=1.0/T, kind=GROWTH, work=None):
+    """
+    Lenia を1ステップ更新する関数 (state をその場で書き換える)。
+    最後の2軸を空間とし、それより前の軸はバッチとして同じカーネルでまとめて計算する。
+
+    引数:
+    state (np.ndarray): 状態 (..., HEIGHT, WIDTH)。
+    spectrum (np.ndarray): kernel_spectrum で計算したカーネルのスペクトル。
+    work (np.ndarray): state と同じ形の作業配列 (成長率を書き込む)。
+    """
+    if work is None:
+        work = np.empty_like(state)
+    potential = np.fft.irfft2(np.fft.rfft2(state) * spectrum, s=state.shape[-2:])
+    growth(potential, mu, sigma, kind, out=work)
+    work *= dt
+    state += work
+    np.clip(state, 0, 1, out=state)
+    return state
+
+
+def initialize_state(shape=(SPACE_GRID_SIZE, SPACE_GRID_SIZE), radius=R, seed=None):
+    """中央の一辺 4*radius (空間より大きければ空間全体) の正方形に一様乱数を置いた状態を作る関数"""
+    rng = np.random.default_rng(seed)
+    state = np.zeros(shape)
+    size = min(4 * radius, shape[0], shape[1])
+    y, x = (shape[0] - size) // 2, (shape[1] - size) // 2
+    state[y:y+size, x:x+size] = rng.random((size, size))
+    return state
+
+
+def time_per_step(radii, shape=(SPACE_GRID_SIZE, SPACE_GRID_SIZE), steps=50):
+    """半径ごとに1ステップの計算時間 (秒) を測る関数 (FFT なので半径によらずほぼ一定になる)"""
+    import time
+    results = []
+    for radius in radii:
+        state = initialize_state(shape, radius, seed=0)
+        work = np.empty_like(state)
+        spectrum = kernel_spectrum(shape, radius)
+        start = time.perf_counter()
+        for _ in range(steps):
+            step(state, spectrum, work=work)
+        results.append((time.perf_counter() - start) / steps)
+    return results
+
+
+if __name__ == '__main__':
+    from alifebook_lib.visualizers import MatrixVisualizer
+
+    for radius, seconds in zip((5, 13, 50), time_per_step((5, 13, 50))):
+        print("R={:3d}: {:.2f} ms/step".format(radius, seconds * 1000))
+
+    state = initialize_state()
+    work = np.empty_like(state)
+    spectrum = kernel_spectrum(state.shape)
+    visualizer = MatrixVisualizer()
+    while visualizer:  # visualizerはウィンドウが閉じられるとFalseを返す
+        for i in range(VISUALIZATION_STEP):
+            step(state, spectrum, work=work)
+        visualizer.update(state)
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""
+計算結果をディスクに保存しておくための簡単なキャッシュ
+
+キー (パラメタのタプル) ごとに1つの JSON ファイルを作る。
+同じパラメタで再実行したときは保存済みの結果を読み込むだけで済むので、
+足りない分だけを計算すればよい。
+"""
+
+import os
+import json
+import hashlib
+
+
+class ResultCache(object):
+    """キーごとに JSON ファイルとして結果を保存するキャッシュ"""
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha1(repr(tuple(key)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def get(self, key):
+        """保存済みの結果を返す。無ければ None。"""
+        try:
+            with open(self._path(key), encoding='utf-8') as fp:
+                return json.load(fp)["value"]
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        """結果を保存する。途中で止まっても壊れたファイルが残らないよう、一時ファイルから置き換える。"""
+        path = self._path(key)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump({"key": list(key), "value": value}, fp)
+        os.replace(tmp_path, path)
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
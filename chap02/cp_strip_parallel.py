@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+周期境界条件の2次元の場を、複数のプロセスで並列に計算するための共通部分 (領域分割)
+
+空間を横長の帯 (strip) に分け、帯ごとに1つのプロセスが計算する。
+各帯は上下1行ずつののりしろを付けた (場の数, 行数+2, 幅) の配列を2つ (ダブルバッファ) 持ち、
+multiprocessing.shared_memory に置く。
+1ステップごとに、全てのプロセスが計算を終えるのをバリアで待ってから、
+上下の帯の端の1行を自分ののりしろにコピーする (ハロー交換)。
+ダブルバッファなので、バリアは1ステップに1回で済む。
+1ステップの計算 (カーネル) は呼び出し側が与える
+(cp_game_of_life_parallel.py のライフゲーム、cp_gray_scott_parallel.py の Gray-Scott モデル)。
+"""
+
+import os
+import time
+import numpy as np
+from threading import BrokenBarrierError
+from multiprocessing import Barrier, Process, shared_memory
+
+
+def _strip_views(shm, n_fields, rows, width, dtype):
+    """共有メモリを (ダブルバッファ, 場の数, rows+2, width) の配列として見る"""
+    return np.ndarray((2, n_fields, rows + 2, width), dtype=dtype, buffer=shm.buf)
+
+
+def _worker(index, names, bounds, n_fields, width, dtype, steps, setup, args, barrier, start_end):
+    n = len(names)
+    shms = []
+    strips = own = up = down = cur = nxt = None
+    try:
+        for name in names:
+            shms.append(shared_memory.SharedMemory(name=name))
+        strips = [_strip_views(shm, n_fields, bounds[i+1] - bounds[i], width, dtype) for i, shm in enumerate(shms)]
+        own, up, down = strips[index], strips[(index - 1) % n], strips[(index + 1) % n]
+        kernel = setup(bounds[index+1] - bounds[index], bounds[index], bounds[index+1], *args)
+        start_end.wait()
+        for g in range(steps):
+            cur, nxt = own[g % 2], own[1 - g % 2]
+            kernel(cur, nxt)
+            barrier.wait()
+            # ハロー交換: 上の帯の最後の行と下の帯の最初の行を、自分ののりしろにコピーする
+            nxt[:, 0] = up[1 - g % 2][:, -2]
+            nxt[:, -1] = down[1 - g % 2][:, 1]
+        start_end.wait()
+    except BrokenBarrierError:
+        pass  # 他のプロセスが失敗した (そのプロセスが例外を表示する)
+    except BaseException:
+        # 他のプロセスと呼び出し側がバリアで待ち続けないよう、バリアを壊してから終わる
+        barrier.abort()
+        start_end.abort()
+        raise
+    finally:
+        del own, up, down, strips, cur, nxt
+        for shm in shms:
+            shm.close()
+
+
+def _wait_workers(start_end, processes, poll):
+    """
+    全てのプロセスが start_end で待つまで、プロセスが生きているかを確かめながら待ってから start_end を通る。
+    シグナルや OOM killer で終了したプロセスはバリアを壊さないので、そのまま待つと止まってしまう。
+    """
+    while start_end.n_waiting < len(processes):
+        if start_end.broken or any(p.exitcode is not None for p in processes):
+            # 残りのプロセスもバリアで待ち続けないよう、バリアを壊してから終わる
+            start_end.abort()
+            raise RuntimeError("a worker process failed (exit codes: {})".format(
+                [p.exitcode for p in processes]))
+        time.sleep(poll)
+    start_end.wait()
+
+
+def run_strips(fields, steps, n_workers, setup, args=(), halo_columns=0, poll=0.001):
+    """
+    場 fields (場の数, HEIGHT, WIDTH) を n_workers 個のプロセスで steps ステップ計算する関数 (周期境界条件)。
+
+    引数:
+    setup (function): 各プロセスで setup(行数, 最初の行, 最後の行+1, *args) として呼ばれ、
+        1ステップを計算する関数 kernel(cur, nxt) を返す関数 (プロセスに渡すので、モジュールの関数にすること)。
+        cur, nxt は (場の数, 行数+2, 幅) の帯で、kernel は cur から次のステップを nxt[:, 1:-1] に書き込む。
+        上下ののりしろは交換済み。左右ののりしろが要るなら kernel が埋める。
+    halo_columns (int): 帯に付ける左右ののりしろの列数 (幅は WIDTH + 2 * halo_columns になる)。
+    poll (float): プロセスの終了を確かめる間隔 (秒)。計った時間にはこの程度の誤差が入る。
+
+    戻り値:
+    (最後の場, 計算にかかった時間 (秒))
+    """
+    n_fields, height, width = fields.shape
+    padded_width = width + 2 * halo_columns
+    columns = slice(halo_columns, halo_columns + width)
+    bounds = np.linspace(0, height, n_workers + 1).astype(int)
+    shms = []
+    try:
+        for i in range(n_workers):
+            rows = bounds[i+1] - bounds[i]
+            size = 2 * n_fields * (rows + 2) * padded_width * fields.dtype.itemsize
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            shms.append(shm)
+            # 上下ののりしろを含めて初期状態を書き込む (周期境界条件)
+            view = _strip_views(shm, n_fields, rows, padded_width, fields.dtype)
+            view[0, :, :, columns] = fields[:, np.arange(bounds[i] - 1, bounds[i+1] + 1) % height]
+            del view
+
+        barrier = Barrier(n_workers)
+        start_end = Barrier(n_workers + 1)
+        names = [shm.name for shm in shms]
+        processes = [Process(target=_worker,
+                             args=(i, names, bounds, n_fields, padded_width, fields.dtype, steps, setup, args,
+                                   barrier, start_end))
+                     for i in range(n_workers)]
+        for p in processes:
+            p.start()
+        try:
+            _wait_workers(start_end, processes, poll)
+            start = time.perf_counter()
+            _wait_workers(start_end, processes, poll)
+            elapsed = time.perf_counter() - start
+        except BrokenBarrierError:
+            raise RuntimeError("a worker process failed (see its traceback above)")
+        finally:
+            barrier.abort()  # 失敗したときに、他のプロセスがバリアで待ち続けないように (成功したときは全員通過済み)
+            for p in processes:
+                p.join()
+
+        result = np.empty_like(fields)
+        for i, shm in enumerate(shms):
+            view = _strip_views(shm, n_fields, bounds[i+1] - bounds[i], padded_width, fields.dtype)
+            result[:, bounds[i]:bounds[i+1]] = view[steps % 2, :, 1:-1, columns]
+            del view
+        return result, elapsed
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+def scaling_table(run, max_workers=None):
+    """
+    同じ問題を1からmax_workers個のプロセスで計算し、時間と速度向上率を表示する関数。
+    run(n) は n 個のプロセスで計算し、かかった時間 (秒) を返す関数 (結果の確認も run の中で行う)。
+
+    戻り値:
+    (プロセス数, 時間) のリスト。
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    results = []
+    for n in range(1, max_workers + 1):
+        elapsed = run(n)
+        results.append((n, elapsed))
+        print("{:2d} workers: {:.3f} s, speedup {:.2f}, efficiency {:.2f}".format(
+            n, elapsed, results[0][1] / elapsed, results[0][1] / elapsed / n))
+    return results